@@ -14,14 +14,1185 @@ from pathlib import Path
 import re
 import time
 import glob
+import json
+import hashlib
+import heapq
+import itertools
+import random
+import argparse
+import contextlib
+import functools
+import io
+import uuid
+import tempfile
+import sqlite3
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+from collections import deque
+from urllib.parse import urlparse, urljoin, parse_qs
+
+# Per-user data directory for cached extraction results
+if os.environ.get("LOCALAPPDATA"):
+    APP_DATA_DIR = Path(os.environ["LOCALAPPDATA"]) / "YouTubeDownloader"
+else:
+    APP_DATA_DIR = Path.home() / ".youtube_downloader"
+
+# Command used to run yt-dlp (replaced by a stub in gui_benchmark.py)
+YT_DLP_COMMAND = ['yt-dlp']
+
+# Seconds kept in reserve before a cached stream URL expires
+INFO_JSON_EXPIRY_MARGIN = 300
+# Assumed lifetime of stream URLs that carry no expire= parameter
+INFO_JSON_MAX_AGE = 3 * 3600
+# Fetched streams older than this are pruned from the stream cache
+STREAM_CACHE_MAX_AGE = 24 * 3600
+
+# Assumed throughput (bytes/s) until the download history has data
+DEFAULT_THROUGHPUT = 2 * 1024 * 1024
+
+# Failure classes, checked in order against the end of the yt-dlp output
+FAILURE_PATTERNS = [
+    ('disk_full', ['No space left on device', 'Errno 28', 'not enough space on the disk']),
+    ('throttled', ['HTTP Error 429', 'Too Many Requests', 'rate-limit', 'rate limit']),
+    ('expired', ['HTTP Error 403', 'Forbidden', 'HTTP Error 410', 'expired']),
+    ('format_unavailable', ['Requested format is not available', 'format is not available']),
+    # Permanent - checked before 'network', whose errors also say "Unable to download"
+    ('video_unavailable', ['HTTP Error 404', 'Not Found', 'Video unavailable', 'Private video',
+                           'This video is not available', 'This video has been removed']),
+    ('network', ['timed out', 'Timeout', 'Connection reset', 'Connection aborted', 'Connection refused',
+                 'IncompleteRead', 'getaddrinfo failed', 'Temporary failure in name resolution',
+                 'Network is unreachable'])
+]
+# Retry policy per failure class: (automatic retries, first backoff in seconds)
+RETRY_POLICIES = {
+    'network': (5, 5),
+    'expired': (2, 0),
+    'throttled': (4, 60),
+    'format_unavailable': (3, 0),
+    'video_unavailable': (0, 0),
+    'disk_full': (0, 0),
+    'unknown': (1, 10)
+}
+FAILURE_DESCRIPTIONS = {
+    'network': "network error or timeout",
+    'expired': "HTTP 403 - stream URLs rejected or expired",
+    'throttled': "throttled by the server (HTTP 429)",
+    'format_unavailable': "requested format unavailable",
+    'video_unavailable': "video not found, private or removed",
+    'disk_full': "disk full",
+    'unknown': "unknown error"
+}
+# Longest wait between automatic retries (seconds)
+MAX_RETRY_BACKOFF = 15 * 60
+
+# File types indexed by the media library
+MEDIA_EXTENSIONS = {'.mp4', '.webm', '.mkv', '.avi', '.mov', '.mp3', '.m4a', '.opus', '.ogg', '.wav', '.flac'}
+# Library view columns: (column, heading, width)
+LIBRARY_COLUMNS = [
+    ('title', "Title", 380),
+    ('format', "Format", 70),
+    ('size', "Size", 90),
+    ('mtime', "Date", 130),
+    ('video_id', "Video ID", 110)
+]
+
+# Proxy pool: weight of the newest measurement in the throughput and error-rate averages
+PROXY_EWMA_ALPHA = 0.3
+# Endpoints slower than this fraction of the fastest one are taken out of rotation
+PROXY_SLOW_FRACTION = 0.25
+# Consecutive route failures before an endpoint is taken out of rotation
+PROXY_MAX_FAILURES = 2
+# First cooldown for an endpoint out of rotation (seconds), doubled on each repeat
+PROXY_COOLDOWN = 10 * 60
+MAX_PROXY_COOLDOWN = 2 * 3600
+# Chance of sending a job to an endpoint other than the fastest, to keep measurements fresh
+PROXY_EXPLORE_RATE = 0.1
+# Downloads smaller than this are too dominated by startup time to measure throughput
+PROXY_MIN_SAMPLE_SIZE = 2 * 1024 * 1024
+# Failure classes blamed on the route rather than the video
+PROXY_FAILURES = {'network', 'throttled', 'expired'}
+# Proxy pool view columns: (column, heading, width)
+PROXY_COLUMNS = [
+    ('endpoint', "Endpoint", 260),
+    ('throughput', "Throughput", 100),
+    ('errors', "Error rate", 80),
+    ('jobs', "Jobs", 60),
+    ('status', "Status", 220)
+]
+
+# Queue priorities - lower values start first
+JOB_PRIORITIES = {"Urgent": 0, "Normal": 1, "Bulk": 2}
+# How often the queue scheduler runs (milliseconds)
+SCHEDULER_INTERVAL_MS = 1000
+
+# Integrity check: sampled blocks hashed per output, and re-queue attempts on failure
+FINGERPRINT_SAMPLES = 16
+FINGERPRINT_BLOCK_SIZE = 1024 * 1024
+MAX_VERIFY_RETRIES = 2
+
+# App methods timed individually in --profile mode
+PROFILED_METHODS = [
+    'log', 'update_format_list', 'parse_formats', 'get_formats_sync',
+    'find_downloaded_file', 'download_video', 'schedule_jobs', 'verify_download'
+]
+# Download pipeline stages in order, with how many jobs each stage works on at once
+PIPELINE_STAGES = ['resolve', 'fetch', 'merge', 'post-process', 'verify', 'index']
+PIPELINE_LIMITS = {
+    'resolve': 2,
+    'fetch': 1,
+    'merge': 1,
+    'post-process': max(1, (os.cpu_count() or 2) // 2),
+    'verify': 2,
+    'index': 1
+}
+# Worker threads running the stages after fetch, across all jobs
+PIPELINE_WORKERS = 6
+# yt-dlp output tags mapped to the download phase they belong to
+PIPELINE_STAGE_TAGS = {
+    '[download]': 'fragment download',
+    '[Merger]': 'merge',
+    '[Metadata]': 'post-process',
+    '[ExtractAudio]': 'post-process',
+    '[EmbedThumbnail]': 'post-process',
+    '[VideoConvertor]': 'post-process',
+    '[VideoRemuxer]': 'post-process',
+    '[FixupM3u8]': 'post-process',
+    '[FixupM4a]': 'post-process',
+    '[FixupDuplicateMoov]': 'post-process',
+    '[MoveFiles]': 'post-process'
+}
+
+class RangedDownloader:
+    """Download one known-length file over several parallel HTTP range requests
+    
+    The file is split into byte ranges that worker threads fetch over their own
+    keep-alive connections and write into a preallocated file at their offsets.
+    A range that stalls is retried from where it stopped, and idle workers split
+    the largest range still in flight so one slow connection cannot hold up the
+    whole download. A cancelled download keeps its partial file and a list of the
+    ranges still missing, so the next run for the same file resumes from them.
+    """
+    
+    def __init__(self, url, output_path, headers=None, connections=8,
+                 min_range_size=1024 * 1024, stall_timeout=20, max_retries=5,
+                 progress_callback=None, cancel_check=None):
+        self.url = url
+        self.output_path = output_path
+        self.headers = dict(headers or {})
+        self.connections = connections
+        self.min_range_size = min_range_size
+        self.stall_timeout = stall_timeout
+        self.max_retries = max_retries
+        self.progress_callback = progress_callback
+        self.cancel_check = cancel_check
+        
+        self.total_size = None
+        self.downloaded = 0
+        self.reported = 0
+        self.lock = threading.Lock()
+        self.progress_lock = threading.Lock()
+        self.pending = deque()
+        self.active = []
+        self.error = None
+    
+    def download(self):
+        """Download the file and return its size in bytes"""
+        self.total_size = self.probe()
+        # Not '.part' - a yt-dlp fallback must not mistake this sparse file for its own
+        part_path = self.output_path + '.ranges.part'
+        state_path = part_path + '.json'
+        
+        if not self.load_state(part_path, state_path):
+            # Preallocate so every worker can write at its own offset
+            with open(part_path, 'wb') as f:
+                f.truncate(self.total_size)
+            
+            range_size = max(self.min_range_size, self.total_size // (self.connections * 4) + 1)
+            for start in range(0, self.total_size, range_size):
+                self.pending.append([start, min(start + range_size, self.total_size) - 1, 0])
+        
+        # Enough workers to split resumed ranges, which may be few but large
+        remaining = self.total_size - self.downloaded
+        workers = [threading.Thread(target=self.worker, args=(part_path,), daemon=True)
+                   for _ in range(min(self.connections, -(-remaining // self.min_range_size)))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        
+        if self.error or self.downloaded < self.total_size:
+            if self.error:
+                # The caller falls back to yt-dlp, so there is nothing to resume
+                for path in (part_path, state_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            else:
+                self.save_state(state_path)
+            raise self.error or RuntimeError("download cancelled")
+        
+        os.replace(part_path, self.output_path)
+        try:
+            os.remove(state_path)
+        except OSError:
+            pass
+        return self.total_size
+    
+    def load_state(self, part_path, state_path):
+        """Queue the ranges a cancelled run of the same file left missing"""
+        try:
+            with open(state_path, encoding='utf-8') as f:
+                state = json.load(f)
+            if state['size'] != self.total_size or os.path.getsize(part_path) != self.total_size:
+                return False
+            ranges = [[int(start), int(end), 0] for start, end in state['ranges']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        
+        self.pending.extend(ranges)
+        self.downloaded = self.total_size - sum(end - start + 1 for start, end, _ in ranges)
+        return True
+    
+    def save_state(self, state_path):
+        """Record the ranges still missing so a later run can resume"""
+        with self.lock:
+            ranges = [[start, end] for start, end, _ in list(self.pending) + self.active
+                      if start <= end]
+        try:
+            with open(state_path, 'w', encoding='utf-8') as f:
+                json.dump({'size': self.total_size, 'ranges': ranges}, f)
+        except OSError as e:
+            print(f"Error saving download state: {e}")
+    
+    def probe(self):
+        """Confirm the server honours range requests and return the file size"""
+        conn, response = self.request(0, 0)
+        try:
+            content_range = response.getheader('Content-Range') or ''
+            response.read()
+            if response.status != 206 or '/' not in content_range:
+                raise RuntimeError("server does not support range requests")
+            return int(content_range.rsplit('/', 1)[1])
+        finally:
+            conn.close()
+    
+    def connect(self, url):
+        parsed = urlparse(url)
+        if parsed.scheme == 'https':
+            return http.client.HTTPSConnection(parsed.netloc, timeout=self.stall_timeout)
+        return http.client.HTTPConnection(parsed.netloc, timeout=self.stall_timeout)
+    
+    def request(self, start, end, conn=None):
+        """Send a range request, following redirects; returns (connection, response)"""
+        url = self.url
+        for _ in range(5):
+            if conn is None:
+                conn = self.connect(url)
+            parsed = urlparse(url)
+            path = parsed.path or '/'
+            if parsed.query:
+                path += '?' + parsed.query
+            
+            headers = dict(self.headers)
+            headers['Range'] = f'bytes={start}-{end}'
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            
+            if response.status in (301, 302, 303, 307, 308):
+                response.read()
+                conn.close()
+                conn = None
+                url = urljoin(url, response.getheader('Location'))
+                # Later requests go straight to the final location
+                self.url = url
+                continue
+            return conn, response
+        
+        raise RuntimeError("too many redirects")
+    
+    def next_range(self):
+        """Take a pending range, or split the largest one still being fetched"""
+        with self.lock:
+            if self.error or (self.cancel_check and self.cancel_check()):
+                return None
+            if self.pending:
+                byte_range = self.pending.popleft()
+                self.active.append(byte_range)
+                return byte_range
+            
+            largest = max(self.active, key=lambda r: r[1] - r[0], default=None)
+            if largest is None or largest[1] - largest[0] < 2 * self.min_range_size:
+                return None
+            
+            middle = (largest[0] + largest[1]) // 2
+            byte_range = [middle + 1, largest[1], 0]
+            largest[1] = middle
+            self.active.append(byte_range)
+            return byte_range
+    
+    def worker(self, part_path):
+        conn = None
+        with open(part_path, 'r+b') as f:
+            while True:
+                byte_range = self.next_range()
+                if byte_range is None:
+                    break
+                
+                failure = None
+                try:
+                    conn = self.fetch_range(conn, f, byte_range)
+                except Exception as e:
+                    if conn:
+                        conn.close()
+                    conn = None
+                    failure = e
+                
+                with self.lock:
+                    self.active.remove(byte_range)
+                    if failure is None or byte_range[0] > byte_range[1]:
+                        continue
+                    # Retry the remainder first so the next free worker picks it up
+                    # (after a cancel it is saved for the next run instead)
+                    self.pending.appendleft(byte_range)
+                    if self.error:
+                        continue
+                    byte_range[2] += 1
+                    if byte_range[2] > self.max_retries:
+                        self.error = RuntimeError(f"range {byte_range[0]}-{byte_range[1]} failed: {failure}")
+        if conn:
+            conn.close()
+    
+    def fetch_range(self, conn, f, byte_range):
+        """Fetch one range into the file; returns a connection that can be reused"""
+        conn, response = self.request(byte_range[0], byte_range[1], conn)
+        if response.status != 206:
+            raise RuntimeError(f"HTTP {response.status}")
+        
+        while True:
+            with self.lock:
+                offset = byte_range[0]
+                remaining = byte_range[1] - offset + 1
+            if remaining <= 0:
+                break
+            if self.error or (self.cancel_check and self.cancel_check()):
+                raise RuntimeError("download stopped")
+            
+            chunk = response.read(min(64 * 1024, remaining))
+            if not chunk:
+                raise RuntimeError("connection closed early")
+            
+            with self.lock:
+                # The range may have been split while this chunk was in flight
+                chunk = chunk[:byte_range[1] - offset + 1]
+                byte_range[0] += len(chunk)
+                self.downloaded += len(chunk)
+                downloaded = self.downloaded
+            
+            try:
+                f.seek(offset)
+                f.write(chunk)
+            except OSError as e:
+                # Disk errors do not go away by retrying
+                with self.lock:
+                    self.error = e
+                raise
+            
+            if self.progress_callback:
+                # Workers get here in any order - only ever report forward progress
+                with self.progress_lock:
+                    if downloaded > self.reported:
+                        self.reported = downloaded
+                        self.progress_callback(downloaded, self.total_size)
+        
+        if response.length:
+            # The tail of this response now belongs to another worker
+            conn.close()
+            conn = None
+        return conn
+
+
+class DownloadHistory:
+    """Local store of completed jobs, used to predict how long new jobs take
+    
+    Each record holds the job's size, kind, host, download throughput and the
+    time spent merging and post-processing. Records are appended to a JSON
+    lines file and only the most recent ones are kept in memory.
+    """
+    
+    def __init__(self, path, max_records=500):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.records = deque(maxlen=max_records)
+        self.load()
+    
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except ValueError:
+                        pass
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error loading download history: {e}")
+    
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Error saving download history: {e}")
+    
+    def similar(self, host, kind):
+        """Return the closest matching records: same host and kind, then same host, then all"""
+        with self.lock:
+            records = list(self.records)
+        for matches in ([r for r in records if r['host'] == host and r['kind'] == kind],
+                        [r for r in records if r['host'] == host],
+                        records):
+            if len(matches) >= 3:
+                return matches
+        return records
+    
+    def predict(self, host, kind, size):
+        """Predict download and merge seconds for a job, or None without enough data"""
+        records = self.similar(host, kind)
+        if size is None:
+            if not records:
+                return None
+            size = median(r['size'] for r in records)
+        
+        throughput = median(r['throughput'] for r in records) if records else DEFAULT_THROUGHPUT
+        
+        merge_records = [r for r in records if r['kind'] == kind and r['size']]
+        merge_rate = median(r['merge_seconds'] / r['size'] for r in merge_records) if merge_records else 0
+        
+        return {'download': size / throughput, 'merge': size * merge_rate}
+
+
+class ProxyPool:
+    """Pool of egress endpoints (proxies) that jobs are spread across
+    
+    Each endpoint keeps a moving average of its throughput and error rate.
+    New jobs go to untried endpoints first, then to the fastest one, with an
+    occasional pick of another so its measurements stay fresh. Endpoints
+    that fail repeatedly or fall far behind the fastest are taken out of
+    rotation for a cooldown that doubles on each repeat. The direct route
+    is the endpoint ''.
+    """
+    
+    def __init__(self, path=None, endpoints=None):
+        self.path = Path(path) if path else None
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.set_endpoints(self.load() if endpoints is None else endpoints)
+    
+    def load(self):
+        if self.path is None:
+            return ['']
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return self.parse(f.read())
+        except FileNotFoundError:
+            return ['']
+        except OSError as e:
+            print(f"Error loading proxy list: {e}")
+            return ['']
+    
+    def parse(self, text):
+        """Parse one proxy URL per line, 'direct' for no proxy and # for comments"""
+        endpoints = []
+        for line in text.splitlines():
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            endpoint = '' if line.lower() == 'direct' else line
+            if endpoint not in endpoints:
+                endpoints.append(endpoint)
+        return endpoints or ['']
+    
+    def save(self, text):
+        """Replace the endpoint list, keeping the measurements of endpoints still in it"""
+        endpoints = self.parse(text)
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write("".join(f"{endpoint or 'direct'}\n" for endpoint in endpoints))
+        self.set_endpoints(endpoints)
+        return endpoints
+    
+    def set_endpoints(self, endpoints):
+        with self.lock:
+            self.stats = {endpoint: self.stats.get(endpoint) or {
+                'throughput': None, 'error_rate': 0.0, 'jobs': 0, 'active': 0,
+                'failures': 0, 'cooldowns': 0, 'cooldown_until': 0, 'reason': ''
+            } for endpoint in endpoints}
+    
+    def label(self, endpoint):
+        """Return a printable name for an endpoint, without any password"""
+        if not endpoint:
+            return "direct"
+        parsed = urlparse(endpoint)
+        if parsed.password:
+            return endpoint.replace(f":{parsed.password}@", ":***@", 1)
+        return endpoint
+    
+    def score(self, endpoint):
+        stats = self.stats[endpoint]
+        return (stats['throughput'] or 0) * (1 - stats['error_rate']) / (1 + stats['active'])
+    
+    def acquire(self):
+        """Pick the endpoint for a new job"""
+        with self.lock:
+            now = time.time()
+            ready = [endpoint for endpoint, stats in self.stats.items() if stats['cooldown_until'] <= now]
+            if not ready:
+                # Everything is out of rotation - use whichever comes back first
+                ready = [min(self.stats, key=lambda endpoint: self.stats[endpoint]['cooldown_until'])]
+            
+            untried = [endpoint for endpoint in ready
+                       if self.stats[endpoint]['jobs'] == 0 and self.stats[endpoint]['active'] == 0]
+            if untried:
+                endpoint = untried[0]
+            elif len(ready) > 1 and random.random() < PROXY_EXPLORE_RATE:
+                endpoint = random.choice(ready)
+            else:
+                endpoint = max(ready, key=self.score)
+            self.stats[endpoint]['active'] += 1
+            return endpoint
+    
+    def release(self, endpoint, size=None, seconds=None, failed=False):
+        """Record the result of a job on an endpoint
+        
+        Pass the size and seconds of a completed download, or failed=True for
+        a route failure; a cancelled or paused job passes neither. Returns a
+        message if the endpoint was taken out of rotation.
+        """
+        with self.lock:
+            stats = self.stats.get(endpoint)
+            if stats is None:
+                return None
+            stats['active'] = max(stats['active'] - 1, 0)
+            
+            if failed:
+                stats['jobs'] += 1
+                stats['error_rate'] += PROXY_EWMA_ALPHA * (1 - stats['error_rate'])
+                stats['failures'] += 1
+                if stats['failures'] >= PROXY_MAX_FAILURES:
+                    return self.cool_down(endpoint, f"{stats['failures']} failures in a row")
+                return None
+            if size is None or seconds is None:
+                return None
+            
+            stats['jobs'] += 1
+            stats['error_rate'] *= 1 - PROXY_EWMA_ALPHA
+            stats['failures'] = 0
+            if size < PROXY_MIN_SAMPLE_SIZE:
+                return None
+            
+            throughput = size / max(seconds, 0.001)
+            if stats['throughput'] is None:
+                stats['throughput'] = throughput
+            else:
+                stats['throughput'] += PROXY_EWMA_ALPHA * (throughput - stats['throughput'])
+            
+            now = time.time()
+            fastest = max(other['throughput'] or 0 for other in self.stats.values()
+                          if other['cooldown_until'] <= now)
+            if stats['throughput'] < fastest * PROXY_SLOW_FRACTION:
+                return self.cool_down(endpoint, f"slow ({stats['throughput']/1024/1024:.2f} MiB/s, "
+                                                f"fastest {fastest/1024/1024:.2f} MiB/s)")
+            stats['cooldowns'] = 0
+            return None
+    
+    def cool_down(self, endpoint, reason):
+        """Take an endpoint out of rotation - call with the lock held"""
+        stats = self.stats[endpoint]
+        duration = min(PROXY_COOLDOWN * 2 ** stats['cooldowns'], MAX_PROXY_COOLDOWN)
+        stats['cooldowns'] += 1
+        stats['cooldown_until'] = time.time() + duration
+        stats['reason'] = reason
+        return f"Endpoint {self.label(endpoint)} out of rotation for {duration // 60} min: {reason}"
+    
+    def snapshot(self):
+        """Return a copy of the per-endpoint stats"""
+        with self.lock:
+            return [(endpoint, dict(stats)) for endpoint, stats in self.stats.items()]
+    
+    def __len__(self):
+        return len(self.stats)
+
+
+class ProxyView:
+    """Window for editing the proxy list and watching per-endpoint stats"""
+    
+    def __init__(self, app, pool):
+        self.app = app
+        self.pool = pool
+        
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Proxy Pool")
+        self.window.geometry("760x460")
+        
+        edit_frame = ttk.LabelFrame(self.window, text="Endpoints - one proxy URL per line, 'direct' for no proxy",
+                                    padding="5")
+        edit_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.text = tk.Text(edit_frame, height=6, font=("Consolas", 9))
+        self.text.pack(fill=tk.X)
+        self.text.insert('1.0', "".join(f"{endpoint or 'direct'}\n" for endpoint, _ in pool.snapshot()))
+        ttk.Button(edit_frame, text="Save", command=self.save).pack(anchor=tk.E, pady=(5, 0))
+        
+        self.tree = ttk.Treeview(self.window, columns=[column for column, _, _ in PROXY_COLUMNS],
+                                 show='headings', selectmode='none')
+        for column, heading, width in PROXY_COLUMNS:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        
+        self.refresh()
+    
+    def save(self):
+        try:
+            endpoints = self.pool.save(self.text.get('1.0', tk.END))
+            self.app.log(f"Proxy pool: {', '.join(self.pool.label(endpoint) for endpoint in endpoints)}")
+            self.refresh()
+        except Exception as e:
+            self.app.show_error(f"Error saving proxy list: {e}")
+    
+    def refresh(self):
+        """Redraw the stats table, once a second while the window is open"""
+        try:
+            if not self.window.winfo_exists():
+                return
+            now = time.time()
+            self.tree.delete(*self.tree.get_children())
+            for endpoint, stats in self.pool.snapshot():
+                if stats['cooldown_until'] > now:
+                    status = f"out for {int(stats['cooldown_until'] - now) // 60 + 1} min - {stats['reason']}"
+                elif stats['active']:
+                    status = "in use"
+                else:
+                    status = "ready"
+                throughput = stats['throughput']
+                self.tree.insert('', tk.END, values=(
+                    self.pool.label(endpoint),
+                    f"{throughput/1024/1024:.2f} MiB/s" if throughput else "-",
+                    f"{stats['error_rate']:.0%}", stats['jobs'], status))
+            self.window.after(1000, self.refresh)
+        except tk.TclError:
+            pass
+        except Exception as e:
+            print(f"Error refreshing proxy pool: {e}")
+
+
+class MediaLibrary:
+    """Incremental SQLite index of downloaded media files
+    
+    Finished jobs are added as they complete. Folders are re-listed only when
+    their modification time has changed, and then only new or changed files
+    are written to the index, so opening the library never rescans an
+    unchanged folder.
+    """
+    
+    def __init__(self, path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        with self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS items (
+                    path TEXT PRIMARY KEY,
+                    folder TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    video_id TEXT NOT NULL DEFAULT '',
+                    format TEXT NOT NULL DEFAULT '',
+                    size INTEGER NOT NULL DEFAULT 0,
+                    mtime REAL NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS items_folder ON items (folder);
+                CREATE INDEX IF NOT EXISTS items_title ON items (title COLLATE NOCASE);
+                CREATE INDEX IF NOT EXISTS items_size ON items (size);
+                CREATE INDEX IF NOT EXISTS items_mtime ON items (mtime);
+                CREATE TABLE IF NOT EXISTS folders (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL
+                );
+            """)
+    
+    def add_item(self, path, title=None, video_id='', fmt='', synced_folder=None):
+        """Index a single file, e.g. a finished download
+        
+        synced_folder is a folder the index was in sync with before the file
+        was written (see folder_in_sync). If it is the file's folder, its stored
+        mtime is moved forward so the new file doesn't cause a full rescan.
+        """
+        path = os.path.abspath(path)
+        folder = os.path.dirname(path)
+        stat = os.stat(path)
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (path, folder, title or Path(path).stem, video_id or '',
+                             fmt or Path(path).suffix.lstrip('.'), stat.st_size, stat.st_mtime))
+            if synced_folder and os.path.abspath(synced_folder) == folder:
+                self.db.execute("UPDATE folders SET mtime = ? WHERE path = ?",
+                                (os.stat(folder).st_mtime, folder))
+    
+    def folder_in_sync(self, folder):
+        """Whether the index is up to date with a folder as it is now"""
+        folder = os.path.abspath(folder)
+        try:
+            folder_mtime = os.stat(folder).st_mtime
+        except OSError:
+            return False
+        with self.lock:
+            row = self.db.execute("SELECT mtime FROM folders WHERE path = ?", (folder,)).fetchone()
+        return bool(row) and row[0] == folder_mtime
+    
+    def sync_folder(self, folder):
+        """Bring the index up to date with a folder; returns the number of changed entries"""
+        folder = os.path.abspath(folder)
+        folder_mtime = os.stat(folder).st_mtime
+        with self.lock:
+            row = self.db.execute("SELECT mtime FROM folders WHERE path = ?", (folder,)).fetchone()
+            if row and row[0] == folder_mtime:
+                return 0
+            known = dict((path, (size, mtime)) for path, size, mtime in self.db.execute(
+                "SELECT path, size, mtime FROM items WHERE folder = ?", (folder,)))
+        
+        changed = []
+        seen = set()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1].lower() not in MEDIA_EXTENSIONS or not entry.is_file():
+                    continue
+                seen.add(entry.path)
+                stat = entry.stat()
+                if known.get(entry.path) != (stat.st_size, stat.st_mtime):
+                    changed.append((entry.path, folder, Path(entry.name).stem, '',
+                                    Path(entry.name).suffix.lstrip('.'), stat.st_size, stat.st_mtime))
+        removed = [(path,) for path in known if path not in seen]
+        
+        with self.lock, self.db:
+            # Files already indexed keep the title and ID recorded at download time
+            self.db.executemany("INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, ?, ?, ?)", changed)
+            self.db.executemany("UPDATE items SET size = ?, mtime = ? WHERE path = ?",
+                                [(row[5], row[6], row[0]) for row in changed])
+            self.db.executemany("DELETE FROM items WHERE path = ?", removed)
+            self.db.execute("INSERT OR REPLACE INTO folders VALUES (?, ?)", (folder, folder_mtime))
+        return len(changed) + len(removed)
+    
+    def query(self, search, sort_column, descending, offset, limit):
+        """Return (total matches, one page of rows) for the view"""
+        if sort_column not in dict((column, heading) for column, heading, _ in LIBRARY_COLUMNS):
+            sort_column = 'mtime'
+        where, params = "", []
+        if search:
+            where = "WHERE title LIKE ? OR video_id = ?"
+            params = [f"%{search}%", search]
+        collate = " COLLATE NOCASE" if sort_column == 'title' else ""
+        order = f"{sort_column}{collate} {'DESC' if descending else 'ASC'}"
+        
+        with self.lock:
+            total = self.db.execute(f"SELECT COUNT(*) FROM items {where}", params).fetchone()[0]
+            rows = self.db.execute(
+                f"SELECT path, title, format, size, mtime, video_id FROM items {where} "
+                f"ORDER BY {order} LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        return total, rows
+
+
+class LibraryView:
+    """Searchable, sortable library window that only renders the visible rows"""
+    
+    def __init__(self, app, library, folder):
+        self.app = app
+        self.library = library
+        self.offset = 0
+        self.total = 0
+        self.visible_rows = 25
+        self.sort_column = 'mtime'
+        self.descending = True
+        self.paths = {}
+        
+        self.window = tk.Toplevel(app.root)
+        self.window.title("Media Library")
+        self.window.geometry("860x560")
+        
+        search_frame = ttk.Frame(self.window, padding="5")
+        search_frame.pack(fill=tk.X)
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self.reset_offset())
+        ttk.Entry(search_frame, textvariable=self.search_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.count_var = tk.StringVar(value="Indexing...")
+        ttk.Label(search_frame, textvariable=self.count_var).pack(side=tk.RIGHT)
+        
+        table_frame = ttk.Frame(self.window)
+        table_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.tree = ttk.Treeview(table_frame, columns=[column for column, _, _ in LIBRARY_COLUMNS],
+                                 show='headings', selectmode='browse')
+        for column, heading, width in LIBRARY_COLUMNS:
+            self.tree.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=width, anchor=tk.W)
+        
+        # The scrollbar tracks the offset into the query, not the Treeview rows
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll_rows(-1 if event.delta > 0 else 1, 3))
+        self.tree.bind('<Button-4>', lambda event: self.scroll_rows(-1, 3))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_rows(1, 3))
+        self.tree.bind('<Double-1>', self.open_selected)
+        
+        self.refresh()
+        threading.Thread(target=self.sync, args=(folder,), daemon=True).start()
+    
+    def sync(self, folder):
+        try:
+            changed = self.library.sync_folder(folder)
+            if changed:
+                self.window.after(0, self.refresh)
+        except Exception as e:
+            print(f"Error indexing library folder: {e}")
+    
+    def refresh(self):
+        """Load the visible page of rows"""
+        try:
+            self.total, rows = self.library.query(self.search_var.get().strip(), self.sort_column,
+                                                  self.descending, self.offset, self.visible_rows)
+            self.tree.delete(*self.tree.get_children())
+            self.paths = {}
+            for path, title, fmt, size, mtime, video_id in rows:
+                item = self.tree.insert('', tk.END, values=(
+                    title, fmt, f"{size/1024/1024:.1f} MB",
+                    time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime)), video_id))
+                self.paths[item] = path
+            
+            self.count_var.set(f"{self.total:,} items")
+            if self.total:
+                self.scrollbar.set(self.offset / self.total,
+                                   min(self.offset + self.visible_rows, self.total) / self.total)
+            else:
+                self.scrollbar.set(0, 1)
+        except Exception as e:
+            print(f"Error refreshing library: {e}")
+    
+    def reset_offset(self):
+        self.offset = 0
+        self.refresh()
+    
+    def sort_by(self, column):
+        if column == self.sort_column:
+            self.descending = not self.descending
+        else:
+            # Newest and largest first, text columns A-Z
+            self.sort_column, self.descending = column, column in ('size', 'mtime')
+        self.reset_offset()
+    
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.total - self.visible_rows))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+    
+    def scroll_rows(self, direction, rows):
+        self.scroll_to(self.offset + direction * rows)
+    
+    def on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * self.total)
+        elif action == 'scroll':
+            rows = self.visible_rows if unit == 'pages' else 1
+            self.scroll_rows(int(amount), rows)
+    
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        rows = max(1, (event.height - row_height) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.refresh()
+    
+    def open_selected(self, event):
+        path = self.paths.get(self.tree.focus())
+        if path:
+            try:
+                self.app.open_path(path)
+            except Exception as e:
+                self.app.show_error(f"Error opening file: {e}")
+
+
+class DownloadPipeline:
+    """Run download jobs through resolve -> fetch -> merge -> post-process -> verify -> index
+    
+    Each stage has its own concurrency limit. The stages up to the hand-off
+    stage (fetch) run on the calling thread; the rest continue on a worker
+    pool, so one job can be merging or verifying while the next downloads.
+    Hooks are called after every stage as hook(stage, job, wait, wall, cpu),
+    where wait is the time spent queued for a free slot in the stage.
+    """
+    
+    def __init__(self, limits=None, handoff_stage='fetch', workers=PIPELINE_WORKERS, thread_wrapper=None):
+        limits = dict(PIPELINE_LIMITS, **(limits or {}))
+        self.slots = {stage: threading.BoundedSemaphore(limits[stage]) for stage in PIPELINE_STAGES}
+        self.handoff_stage = handoff_stage
+        self.workers = workers
+        self.thread_wrapper = thread_wrapper
+        self.executor = None
+        self.hooks = []
+        self.lock = threading.Lock()
+        self.pending = 0
+    
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+    
+    def busy(self):
+        """Return True while handed-off jobs are still running their later stages"""
+        with self.lock:
+            return self.pending > 0
+    
+    def run(self, job, steps, finish=None):
+        """Run a job's steps, a list of (stage, function) pairs
+        
+        A step returning False ends the job early. finish(job, error) is
+        called once the job leaves the pipeline, on whichever thread ran its
+        last step, with the exception that ended it or None.
+        """
+        for index, (stage, step) in enumerate(steps):
+            try:
+                carry_on = self.run_stage(stage, step, job) is not False
+            except Exception as e:
+                self.finish(job, finish, e)
+                return
+            if not carry_on:
+                break
+            
+            if stage == self.handoff_stage and index + 1 < len(steps):
+                with self.lock:
+                    self.pending += 1
+                    if self.executor is None:
+                        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pipeline")
+                target = self.thread_wrapper(self.run_handed_off) if self.thread_wrapper else self.run_handed_off
+                self.executor.submit(target, job, steps[index + 1:], finish)
+                return
+        
+        self.finish(job, finish, None)
+    
+    def run_handed_off(self, job, steps, finish):
+        try:
+            self.run(job, steps, finish)
+        finally:
+            with self.lock:
+                self.pending -= 1
+    
+    def run_stage(self, stage, step, job):
+        """Run one step once its stage has a free slot, then call the hooks"""
+        queued = time.perf_counter()
+        with self.slots[stage]:
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return step(job)
+            finally:
+                wait = wall - queued
+                wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+                for hook in self.hooks:
+                    try:
+                        hook(stage, job, wait, wall, cpu)
+                    except Exception as e:
+                        print(f"Error in pipeline hook: {e}")
+    
+    def finish(self, job, finish, error):
+        if finish:
+            try:
+                finish(job, error)
+            except Exception as e:
+                print(f"Error finishing job: {e}")
+
+
+class PerformanceProfiler:
+    """Collect per-stage and per-function timings for --profile mode
+    
+    Wall time is measured with perf_counter and CPU time with thread_time, so
+    a stage that mostly waits on yt-dlp shows a high wall time but little CPU.
+    cProfile and tracemalloc are optional because they slow the app down.
+    """
+    
+    def __init__(self, use_cprofile=False, use_tracemalloc=False):
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.phases = threading.local()
+        self.cprofiles = []
+        self.use_cprofile = use_cprofile
+        self.use_tracemalloc = use_tracemalloc
+        self.main_cprofile = None
+        self.start_snapshot = None
+        
+        if use_cprofile:
+            import cProfile
+            self.main_cprofile = cProfile.Profile()
+            self.main_cprofile.enable()
+        if use_tracemalloc:
+            import tracemalloc
+            tracemalloc.start(10)
+            self.start_snapshot = tracemalloc.take_snapshot()
+    
+    def record(self, category, name, wall, cpu):
+        with self.lock:
+            entry = self.timings.setdefault((category, name), [0, 0.0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += wall
+            entry[2] += cpu
+            entry[3] = max(entry[3], wall)
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time a block of code as a download phase"""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.record('stage', name, time.perf_counter() - wall, time.thread_time() - cpu)
+    
+    def enter_phase(self, name):
+        """Switch the calling thread to a new download phase, closing the previous one"""
+        current = getattr(self.phases, 'current', None)
+        if current and current[0] == name:
+            return
+        self.end_phase()
+        if name:
+            self.phases.current = (name, time.perf_counter(), time.thread_time())
+    
+    def end_phase(self):
+        current = getattr(self.phases, 'current', None)
+        if current:
+            name, wall, cpu = current
+            self.record('stage', name, time.perf_counter() - wall, time.thread_time() - cpu)
+            self.phases.current = None
+    
+    def wrap_methods(self, obj, names):
+        """Replace methods on an instance with timed versions"""
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.timed(name, method))
+    
+    def timed(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record('function', name, time.perf_counter() - wall, time.thread_time() - cpu)
+        return wrapper
+    
+    def profile_thread(self, func):
+        """Wrap a thread target so cProfile also covers that thread"""
+        if not self.use_cprofile:
+            return func
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            import cProfile
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process, and the
+                # main one already sees every thread - run the target unprofiled
+                profile = None
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.disable()
+                    with self.lock:
+                        self.cprofiles.append(profile)
+        return wrapper
+    
+    def write_report(self, report_dir):
+        """Write the report to a timestamped file and return its path"""
+        lines = [
+            f"Profile report - {time.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"Session wall time: {time.perf_counter() - self.start_wall:.2f}s, "
+            f"process CPU time: {time.process_time() - self.start_cpu:.2f}s",
+            ""
+        ]
+        
+        for category, title in (('pipeline', "Pipeline stages"), ('stage', "Download phases"),
+                                ('function', "App functions")):
+            rows = sorted(((name, entry) for (kind, name), entry in self.timings.items() if kind == category),
+                          key=lambda row: row[1][1], reverse=True)
+            lines.append(title)
+            lines.append(f"  {'name':<24}{'calls':>8}{'wall total':>12}{'wall avg':>12}{'wall max':>12}{'cpu total':>12}")
+            for name, (count, wall, cpu, wall_max) in rows:
+                lines.append(f"  {name:<24}{count:>8}{wall:>11.3f}s{wall / count:>11.4f}s"
+                             f"{wall_max:>11.3f}s{cpu:>11.3f}s")
+            if not rows:
+                lines.append("  (none recorded)")
+            lines.append("")
+        
+        if self.use_cprofile:
+            import pstats
+            self.main_cprofile.disable()
+            stream = io.StringIO()
+            stats = pstats.Stats(self.main_cprofile, stream=stream)
+            for profile in self.cprofiles:
+                stats.add(profile)
+            stats.sort_stats('cumulative').print_stats(30)
+            lines.append("Top hot spots (cProfile, all profiled threads)")
+            lines.append(stream.getvalue())
+        
+        if self.use_tracemalloc:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"Memory (tracemalloc): current {current / 1024 / 1024:.2f} MB, "
+                         f"peak {peak / 1024 / 1024:.2f} MB")
+            lines.append("Top memory growth since start:")
+            for stat in snapshot.compare_to(self.start_snapshot, 'lineno')[:15]:
+                lines.append(f"  {stat}")
+            lines.append("")
+        
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        report_path = report_dir / f"profile-{time.strftime('%Y%m%d-%H%M%S')}.txt"
+        report_path.write_text("\n".join(lines), encoding='utf-8')
+        return report_path
+
 
 class FixedYouTubeDownloader:
-    def __init__(self):
+    def __init__(self, profiler=None):
         self.root = None
         self.download_path = str(Path.home() / "Videos")
         self.is_downloading = False
         self.process = None
         self.download_thread = None
+        self.info_cache = {}
+        self.job_queue = []
+        self.job_counter = itertools.count()
+        self.current_job = None
+        self.profiler = profiler
+        self.history = DownloadHistory(APP_DATA_DIR / "history.jsonl")
+        self.recent_output = deque(maxlen=50)
+        self.last_failed_job = None
+        self.library = None
+        self.proxy_pool = ProxyPool(APP_DATA_DIR / "proxies.txt")
+        self.pipeline = DownloadPipeline(thread_wrapper=profiler.profile_thread if profiler else None)
+        self.pipeline.add_hook(self.on_stage_done)
+        
+        if self.profiler:
+            self.profiler.wrap_methods(self, PROFILED_METHODS)
         
         # Initialize GUI with proper error handling
         self.init_gui()
@@ -34,8 +1205,8 @@ class FixedYouTubeDownloader:
             # Create root window
             self.root = tk.Tk()
             self.root.title("YouTube Video Downloader - Fixed Version")
-            self.root.geometry("800x600")
-            self.root.minsize(700, 500)
+            self.root.geometry("820x760")
+            self.root.minsize(700, 600)
             
             print("Root window created successfully")
             
@@ -45,6 +1216,7 @@ class FixedYouTubeDownloader:
             self.progress_var = tk.DoubleVar()
             self.force_download_var = tk.BooleanVar()
             self.selected_format = tk.StringVar(value="best[height<=720]")
+            self.selected_renditions = []
             self.available_formats = []
             
             print("Variables created successfully")
@@ -57,6 +1229,9 @@ class FixedYouTubeDownloader:
             self.root.protocol("WM_DELETE_WINDOW", self.safe_close)
             print("Window protocol set successfully")
             
+            # Start the queue scheduler
+            self.root.after(SCHEDULER_INTERVAL_MS, self.schedule_jobs)
+            
             # Check dependencies (but don't let it crash the app)
             try:
                 self.check_yt_dlp()
@@ -111,6 +1286,22 @@ class FixedYouTubeDownloader:
             self.filename_entry.pack(fill=tk.X, pady=5)
             ttk.Label(filename_frame, text="Leave empty to use video title", font=("Arial", 8)).pack(anchor=tk.W)
             
+            # Clip sections
+            clip_frame = ttk.Frame(main_frame)
+            clip_frame.pack(fill=tk.X, pady=5)
+            
+            ttk.Label(clip_frame, text="Clip sections (optional):").pack(anchor=tk.W)
+            clip_input_frame = ttk.Frame(clip_frame)
+            clip_input_frame.pack(fill=tk.X, pady=5)
+            
+            self.sections_var = tk.StringVar()
+            ttk.Entry(clip_input_frame, textvariable=self.sections_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 10))
+            self.precise_cuts_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(clip_input_frame, text="Precise cuts (re-encode)", 
+                           variable=self.precise_cuts_var).pack(side=tk.RIGHT)
+            ttk.Label(clip_frame, text="e.g. 1:00-1:30, 1:05:00-1:05:20 - only these parts are downloaded", 
+                     font=("Arial", 8)).pack(anchor=tk.W)
+            
             # Format selection
             format_frame = ttk.LabelFrame(main_frame, text="Format Selection", padding="5")
             format_frame.pack(fill=tk.X, pady=10)
@@ -129,8 +1320,10 @@ class FixedYouTubeDownloader:
                       command=self.clear_filename).pack(side=tk.LEFT)
             
             # Format listbox
-            self.format_listbox = tk.Listbox(format_frame, height=4)
+            self.format_listbox = tk.Listbox(format_frame, height=4, selectmode=tk.EXTENDED)
             self.format_listbox.pack(fill=tk.X, pady=5)
+            ttk.Label(format_frame, text="Ctrl+click several video formats to export multiple renditions",
+                      font=("Arial", 8)).pack(anchor=tk.W)
             
             # Selected format display
             format_info_frame = ttk.Frame(format_frame)
@@ -142,7 +1335,7 @@ class FixedYouTubeDownloader:
             self.selected_format_label.pack(side=tk.LEFT, padx=(10, 0))
             
             # Audio quality selection
-            audio_frame = ttk.LabelFrame(main_frame, text="Audio Quality (for high-res videos)", padding="5")
+            audio_frame = ttk.LabelFrame(main_frame, text="Audio Quality (for high-res videos and audio-only)", padding="5")
             audio_frame.pack(fill=tk.X, pady=5)
             
             self.audio_quality_var = tk.StringVar(value="bestaudio")
@@ -162,6 +1355,26 @@ class FixedYouTubeDownloader:
                 ttk.Radiobutton(audio_quality_frame, text=text, variable=self.audio_quality_var, 
                                value=value).pack(side=tk.LEFT, padx=(10, 0))
             
+            # Audio-only downloads skip the video stream entirely
+            audio_only_frame = ttk.Frame(audio_frame)
+            audio_only_frame.pack(fill=tk.X, pady=5)
+            
+            self.audio_only_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(audio_only_frame, text="Audio only (no video)", 
+                           variable=self.audio_only_var).pack(side=tk.LEFT)
+            
+            self.audio_format_var = tk.StringVar(value="best")
+            audio_formats = [
+                ("Original (no re-encode)", "best"),
+                ("M4A", "m4a"),
+                ("Opus", "opus"),
+                ("MP3 (transcode)", "mp3")
+            ]
+            
+            for text, value in audio_formats:
+                ttk.Radiobutton(audio_only_frame, text=text, variable=self.audio_format_var, 
+                               value=value).pack(side=tk.LEFT, padx=(10, 0))
+            
             # Download path
             path_frame = ttk.Frame(main_frame)
             path_frame.pack(fill=tk.X, pady=5)
@@ -195,6 +1408,12 @@ class FixedYouTubeDownloader:
                                                 variable=self.fast_download_var)
             self.fast_checkbox.pack(anchor=tk.W)
             
+            self.multi_connection_var = tk.BooleanVar(value=False)
+            self.multi_connection_checkbox = ttk.Checkbutton(options_frame, 
+                                                text="Multi-connection download (single-file formats, 8 parallel ranges)", 
+                                                variable=self.multi_connection_var)
+            self.multi_connection_checkbox.pack(anchor=tk.W)
+            
             
             # Buttons
             button_frame = ttk.Frame(main_frame)
@@ -216,6 +1435,43 @@ class FixedYouTubeDownloader:
                                             command=self.open_videos_folder)
             self.open_folder_btn.pack(side=tk.LEFT, padx=(0, 10))
             
+            self.library_btn = ttk.Button(button_frame, text="Library", 
+                                         command=self.open_library)
+            self.library_btn.pack(side=tk.LEFT, padx=(0, 10))
+            
+            self.proxies_btn = ttk.Button(button_frame, text="Proxies", 
+                                         command=self.open_proxies)
+            self.proxies_btn.pack(side=tk.LEFT, padx=(0, 10))
+            
+            # Download queue
+            queue_frame = ttk.LabelFrame(main_frame, text="Download Queue", padding="5")
+            queue_frame.pack(fill=tk.X, pady=5)
+            
+            queue_options_frame = ttk.Frame(queue_frame)
+            queue_options_frame.pack(fill=tk.X, pady=5)
+            
+            ttk.Label(queue_options_frame, text="Priority:").pack(side=tk.LEFT)
+            self.priority_var = tk.StringVar(value="Normal")
+            ttk.Combobox(queue_options_frame, textvariable=self.priority_var, values=list(JOB_PRIORITIES),
+                         state="readonly", width=8).pack(side=tk.LEFT, padx=(5, 10))
+            
+            self.off_peak_var = tk.BooleanVar(value=False)
+            ttk.Checkbutton(queue_options_frame, text="Off-peak only", 
+                           variable=self.off_peak_var).pack(side=tk.LEFT, padx=(0, 10))
+            
+            ttk.Label(queue_options_frame, text="Off-peak hours:").pack(side=tk.LEFT)
+            self.off_peak_hours_var = tk.StringVar(value="22:00-06:00")
+            ttk.Entry(queue_options_frame, textvariable=self.off_peak_hours_var, 
+                     width=12).pack(side=tk.LEFT, padx=(5, 10))
+            
+            ttk.Button(queue_options_frame, text="Add to Queue", 
+                      command=self.add_to_queue).pack(side=tk.LEFT, padx=(0, 10))
+            ttk.Button(queue_options_frame, text="Remove", 
+                      command=self.remove_from_queue).pack(side=tk.LEFT)
+            
+            self.queue_listbox = tk.Listbox(queue_frame, height=3)
+            self.queue_listbox.pack(fill=tk.X, pady=5)
+            
             # Progress
             self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, 
                                               maximum=100)
@@ -225,6 +1481,9 @@ class FixedYouTubeDownloader:
             self.status_label = ttk.Label(main_frame, textvariable=self.status_var)
             self.status_label.pack(pady=5)
             
+            self.eta_var = tk.StringVar(value="")
+            ttk.Label(main_frame, textvariable=self.eta_var, font=("Arial", 8)).pack()
+            
             # Log area
             log_frame = ttk.LabelFrame(main_frame, text="Download Log", padding="5")
             log_frame.pack(fill=tk.BOTH, expand=True, pady=10)
@@ -270,6 +1529,36 @@ class FixedYouTubeDownloader:
         except Exception as e:
             print(f"Log error: {e}")
     
+    def profile_stage(self, name):
+        """Return a context manager timing a download phase in --profile mode"""
+        if self.profiler:
+            return self.profiler.stage(name)
+        return contextlib.nullcontext()
+    
+    def handle_output_line(self, line):
+        """Follow the download phase of a yt-dlp output line
+        
+        Keeps recent output for failure classification, marks when merging
+        starts for the ETA history, and attributes time to the stage in
+        --profile mode.
+        """
+        self.recent_output.append(line)
+        if not line.startswith('['):
+            return
+        
+        tag = line.split(']', 1)[0] + ']'
+        stage = PIPELINE_STAGE_TAGS.get(tag, 'extraction')
+        
+        if stage in ('merge', 'post-process'):
+            job = self.current_job
+            if job is not None and not job.get('merge_started'):
+                job['merge_started'] = time.time()
+            if stage == 'merge':
+                self.status_var.set("Merging video and audio...")
+        
+        if self.profiler:
+            self.profiler.enter_phase(stage)
+    
     def clear_log(self):
         """Clear log safely"""
         try:
@@ -300,7 +1589,7 @@ class FixedYouTubeDownloader:
     def check_yt_dlp(self):
         """Check if yt-dlp is available"""
         try:
-            result = subprocess.run(['yt-dlp', '--version'], 
+            result = subprocess.run([*YT_DLP_COMMAND, '--version'], 
                                   capture_output=True, text=True, timeout=5)
             if result.returncode == 0:
                 self.log(f"yt-dlp version: {result.stdout.strip()}")
@@ -390,11 +1679,21 @@ OR use chocolatey:
         self.root.update()
         
         try:
-            cmd = ['yt-dlp', '--list-formats', '--no-playlist', url]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            # Dump the fully resolved info so the download can reuse it
+            endpoint = self.proxy_pool.acquire()
+            cmd = [*YT_DLP_COMMAND, '--dump-single-json', '--no-playlist', url]
+            if endpoint:
+                cmd[1:1] = ['--proxy', endpoint]
+            try:
+                with self.profile_stage("extraction"):
+                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            finally:
+                self.proxy_pool.release(endpoint)
             
             if result.returncode == 0:
-                formats = self.parse_formats(result.stdout)
+                info = json.loads(result.stdout)
+                self.save_info_json(url, info, endpoint)
+                formats = self.parse_formats(info)
                 self.update_format_list(formats)
                 self.log(f"Found {len(formats)} available formats")
                 self.status_var.set(f"Found {len(formats)} formats - Select one to download")
@@ -410,34 +1709,98 @@ OR use chocolatey:
             self.log(f"Error fetching formats: {e}")
             self.status_var.set("Error getting formats")
     
-    def parse_formats(self, output):
-        """Parse format output from yt-dlp"""
+    def parse_formats(self, info):
+        """Build the format list from a yt-dlp info dict"""
         formats = []
-        lines = output.split('\n')
-        
-        for line in lines:
-            if 'ID' in line and 'EXT' in line and 'RESOLUTION' in line:
-                continue  # Skip header
-            
-            parts = line.split()
-            if len(parts) >= 4:
-                format_id = parts[0]
-                ext = parts[1]
-                resolution = parts[2] if parts[2] != 'audio' else 'audio'
-                size = parts[3] if len(parts) > 3 else 'unknown'
-                
-                if format_id and ext:
-                    format_info = {
-                        'id': format_id,
-                        'ext': ext,
-                        'resolution': resolution,
-                        'size': size,
-                        'display': f"{format_id} - {ext} - {resolution} - {size}"
-                    }
-                    formats.append(format_info)
+        
+        for fmt in info.get('formats') or []:
+            format_id = fmt.get('format_id')
+            ext = fmt.get('ext')
+            if not format_id or not ext:
+                continue
+            
+            if fmt.get('vcodec') == 'none':
+                resolution = 'audio'
+            else:
+                resolution = fmt.get('resolution') or 'unknown'
+            
+            filesize = fmt.get('filesize') or fmt.get('filesize_approx')
+            size = f"{filesize/1024/1024:.1f}MiB" if filesize else 'unknown'
+            
+            formats.append({
+                'id': format_id,
+                'ext': ext,
+                'resolution': resolution,
+                'size': size,
+                'height': fmt.get('height'),
+                'vcodec': fmt.get('vcodec'),
+                'acodec': fmt.get('acodec'),
+                'display': f"{format_id} - {ext} - {resolution} - {size}"
+            })
         
         return formats
     
+    def save_info_json(self, url, info, endpoint=''):
+        """Save the resolved info dict so the download stage can skip extraction"""
+        try:
+            info_dir = APP_DATA_DIR / "info"
+            info_dir.mkdir(parents=True, exist_ok=True)
+            video_id = re.sub(r'[^\w-]', '_', str(info.get('id') or 'video'))
+            info_path = info_dir / f"{video_id}.info.json"
+            with open(info_path, 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            
+            self.info_cache[url] = {
+                'path': str(info_path),
+                'info': info,
+                'expires': self.get_stream_expiry(info),
+                'endpoint': endpoint
+            }
+        except Exception as e:
+            # Not fatal - the download just falls back to a fresh extraction
+            self.log(f"Could not cache video info: {e}")
+    
+    def get_stream_expiry(self, info):
+        """Return the earliest expiry time of the stream URLs in an info dict"""
+        expiry_times = []
+        for fmt in info.get('formats') or []:
+            try:
+                query = parse_qs(urlparse(fmt.get('url') or '').query)
+                if 'expire' in query:
+                    expiry_times.append(int(query['expire'][0]))
+            except (ValueError, IndexError):
+                pass
+        
+        if expiry_times:
+            return min(expiry_times)
+        return time.time() + INFO_JSON_MAX_AGE
+    
+    def get_download_source(self, url):
+        """Return the yt-dlp input arguments for a URL, reusing cached info while valid"""
+        cached = self.info_cache.get(url)
+        if cached and os.path.exists(cached['path']):
+            job = self.current_job
+            if job is not None and job.get('endpoint', '') != cached.get('endpoint', ''):
+                # Stream URLs can be bound to the address that resolved them
+                self.log("Video info was resolved through another route - extracting again")
+                return [url]
+            if time.time() < cached['expires'] - INFO_JSON_EXPIRY_MARGIN:
+                self.log("Reusing resolved video info - skipping re-extraction")
+                return ['--load-info-json', cached['path']]
+            self.log("Cached stream URLs have expired - extracting again")
+        
+        self.invalidate_info_json(url)
+        return [url]
+    
+    def invalidate_info_json(self, url):
+        """Forget the cached info for a URL"""
+        cached = self.info_cache.pop(url, None)
+        if cached:
+            try:
+                os.remove(cached['path'])
+            except OSError:
+                pass
+    
     def update_format_list(self, formats):
         """Update the format listbox"""
         try:
@@ -453,14 +1816,25 @@ OR use chocolatey:
     def on_format_select(self, event):
         """Handle format selection"""
         try:
-            selection = self.format_listbox.curselection()
-            if selection:
-                index = selection[0]
-                if index < len(self.available_formats):
-                    selected_format = self.available_formats[index]
-                    self.selected_format.set(selected_format['id'])
-                    self.selected_format_label.config(text=selected_format['display'])
-                    self.log(f"Selected format: {selected_format['display']}")
+            selection = [index for index in self.format_listbox.curselection()
+                         if index < len(self.available_formats)]
+            if len(selection) > 1:
+                # Several video formats selected - export one rendition per format
+                video_formats = [self.available_formats[index] for index in selection
+                                 if self.available_formats[index]['resolution'] != 'audio']
+                self.selected_renditions = [format_info['id'] for format_info in video_formats]
+                if self.selected_renditions:
+                    self.selected_format.set(self.selected_renditions[0])
+                renditions_text = ", ".join(format_info['display'] for format_info in video_formats)
+                self.selected_format_label.config(text=f"{len(video_formats)} renditions: "
+                                                       f"{', '.join(self.selected_renditions)}")
+                self.log(f"Selected renditions: {renditions_text}")
+            elif selection:
+                selected_format = self.available_formats[selection[0]]
+                self.selected_renditions = []
+                self.selected_format.set(selected_format['id'])
+                self.selected_format_label.config(text=selected_format['display'])
+                self.log(f"Selected format: {selected_format['display']}")
         except Exception as e:
             print(f"Error selecting format: {e}")
     
@@ -469,9 +1843,11 @@ OR use chocolatey:
         try:
             self.url_var.set("")
             self.filename_var.set("")
+            self.sections_var.set("")
             self.format_listbox.delete(0, tk.END)
             self.selected_format_label.config(text="best[height<=720] (default)")
             self.selected_format.set("best[height<=720]")
+            self.selected_renditions = []
             self.available_formats = []
             self.status_var.set("Ready to download")
             self.log("URL and filename fields cleared - ready for new download")
@@ -509,6 +1885,28 @@ OR use chocolatey:
             self.show_error("Download path does not exist!")
             return
         
+        try:
+            self.parse_sections(self.sections_var.get())
+        except ValueError as e:
+            self.show_error(f"Invalid clip sections: {e}")
+            return
+        
+        # A paused job that hasn't gone back to the queue yet keeps its place
+        if self.current_job is not None and self.current_job['paused']:
+            self.current_job['paused'] = False
+            self.current_job['force'] = False
+            self.push_job(self.current_job)
+        
+        # Every download gets a job record; direct downloads count as urgent
+        job = self.build_job(url, download_path, "Urgent", False)
+        job['estimate'] = self.estimate_job(job)
+        job['interactive'] = True
+        self.run_job(job)
+    
+    def run_job(self, job):
+        """Start a job's download thread from its record, leaving the form alone"""
+        self.current_job = job
+        
         # Start download in thread
         self.is_downloading = True
         self.download_btn.config(state="disabled")
@@ -518,30 +1916,372 @@ OR use chocolatey:
         
         # Start download thread
         try:
-            self.download_thread = threading.Thread(target=self.download_video, args=(url, download_path))
+            target = self.profiler.profile_thread(self.download_video) if self.profiler else self.download_video
+            self.download_thread = threading.Thread(target=target, args=(job['url'], job['download_path']))
             self.download_thread.daemon = True
             self.download_thread.start()
         except Exception as e:
             self.show_error(f"Failed to start download: {e}")
             self.reset_buttons()
     
-    def cancel_download(self):
-        """Cancel download"""
-        if self.is_downloading:
-            self.is_downloading = False
-            self.status_var.set("Cancelling...")
-            self.log("Download cancelled by user")
-            
-            # Terminate process if running
-            if self.process and self.process.poll() is None:
-                try:
+    def add_to_queue(self):
+        """Queue the current URL and settings as a job"""
+        url = self.url_var.get().strip()
+        is_valid, error_msg = self.validate_url(url)
+        if not is_valid:
+            self.show_error(f"Invalid URL: {error_msg}")
+            return
+        
+        download_path = self.path_var.get().strip() or self.download_path
+        if not os.path.exists(download_path):
+            self.show_error("Download path does not exist!")
+            return
+        
+        try:
+            self.parse_sections(self.sections_var.get())
+        except ValueError as e:
+            self.show_error(f"Invalid clip sections: {e}")
+            return
+        
+        if self.off_peak_var.get():
+            try:
+                self.parse_time_window(self.off_peak_hours_var.get())
+            except ValueError as e:
+                self.show_error(f"Invalid off-peak hours: {e}")
+                return
+        
+        job = self.build_job(url, download_path, self.priority_var.get(), self.off_peak_var.get())
+        self.push_job(job)
+        self.log(f"Queued [{job['priority']}] {url}" + (" (off-peak only)" if job['off_peak'] else ""))
+    
+    def build_job(self, url, download_path, priority, off_peak):
+        """Create a job record from the current form settings"""
+        return {
+            'id': uuid.uuid4().hex[:12],
+            'url': url,
+            'download_path': download_path,
+            'format': self.selected_format.get(),
+            'renditions': list(self.selected_renditions),
+            'filename': self.filename_var.get().strip(),
+            'sections': self.sections_var.get().strip(),
+            'precise_cuts': self.precise_cuts_var.get(),
+            'audio_quality': self.audio_quality_var.get(),
+            'audio_only': self.audio_only_var.get(),
+            'audio_format': self.audio_format_var.get(),
+            'force': self.force_download_var.get(),
+            'fast_download': self.fast_download_var.get(),
+            'speed_boost': self.speed_boost_var.get(),
+            'multi_connection': self.multi_connection_var.get(),
+            'priority': priority,
+            'off_peak': off_peak,
+            'paused': False,
+            'outputs': []
+        }
+    
+    def push_job(self, job):
+        """Add a job to the priority queue, shortest predicted job first within a priority"""
+        job['estimate'] = self.estimate_job(job)
+        sort_estimate = job['estimate'] if job['estimate'] is not None else float('inf')
+        heapq.heappush(self.job_queue, (JOB_PRIORITIES[job['priority']], sort_estimate,
+                                        next(self.job_counter), job))
+        self.update_queue_list()
+    
+    def remove_from_queue(self):
+        """Remove the selected job from the queue"""
+        try:
+            selection = self.queue_listbox.curselection()
+            if selection:
+                entry = sorted(self.job_queue)[selection[0]]
+                self.job_queue.remove(entry)
+                heapq.heapify(self.job_queue)
+                self.update_queue_list()
+                self.log(f"Removed from queue: {entry[-1]['url']}")
+        except Exception as e:
+            print(f"Error removing job: {e}")
+    
+    def update_queue_list(self):
+        """Refresh the queue listbox in start order"""
+        try:
+            self.queue_listbox.delete(0, tk.END)
+            for entry in sorted(self.job_queue):
+                job = entry[-1]
+                flags = []
+                if job['off_peak']:
+                    flags.append("off-peak")
+                if job['paused']:
+                    flags.append("paused")
+                if job.get('not_before', 0) > time.time():
+                    flags.append("retry pending")
+                if job.get('estimate'):
+                    flags.append(f"~{self.format_duration(job['estimate'])}")
+                suffix = f" ({', '.join(flags)})" if flags else ""
+                self.queue_listbox.insert(tk.END, f"[{job['priority']}] {job['url']} - {job['format']}{suffix}")
+        except Exception as e:
+            print(f"Error updating queue list: {e}")
+    
+    def job_kind(self, job):
+        """Classify a job by how it is downloaded"""
+        if job['audio_only']:
+            return 'audio'
+        if len(job['renditions']) > 1:
+            return 'renditions'
+        if '+' in job['format'] or self.needs_audio_merge(job['format'], self.get_job_formats(job)):
+            return 'merge'
+        return 'standard'
+    
+    def estimate_job_size(self, job):
+        """Estimate the bytes a job will download from its cached video info"""
+        cached = self.info_cache.get(job['url'])
+        if not cached:
+            return None
+        
+        info = cached['info']
+        formats = {fmt.get('format_id'): fmt for fmt in info.get('formats') or []}
+        
+        def format_size(fmt):
+            return fmt.get('filesize') or fmt.get('filesize_approx') or 0
+        
+        audio_formats = [fmt for fmt in formats.values() if fmt.get('vcodec') == 'none']
+        audio_size = format_size(max(audio_formats, key=lambda fmt: fmt.get('abr') or 0)) if audio_formats else 0
+        
+        kind = self.job_kind(job)
+        if kind == 'audio':
+            return audio_size or None
+        
+        video_size = 0
+        for format_id in job['renditions'] or [job['format']]:
+            if format_id not in formats or not format_size(formats[format_id]):
+                # Format selectors like best[height<=720] - use yt-dlp's default pick
+                return info.get('filesize_approx')
+            video_size += format_size(formats[format_id])
+        
+        if kind in ('merge', 'renditions'):
+            video_size += audio_size
+        return video_size
+    
+    def estimate_job(self, job):
+        """Predict a job's total duration in seconds, or None if unknown"""
+        host = urlparse(job['url']).hostname or ''
+        size = self.estimate_job_size(job)
+        
+        cached = self.info_cache.get(job['url'])
+        duration = cached['info'].get('duration') if cached else None
+        if size and duration and job['sections']:
+            # Clips only download their share of the video
+            try:
+                clip_seconds = sum(end - start for start, end in self.parse_sections(job['sections']))
+                size = size * min(clip_seconds / duration, 1.0)
+            except ValueError:
+                pass
+        
+        prediction = self.history.predict(host, self.job_kind(job), size)
+        if prediction is None:
+            return None
+        return prediction['download'] + prediction['merge']
+    
+    def update_eta(self):
+        """Show the predicted time left for the running job and the whole queue"""
+        job = self.current_job
+        remaining = 0
+        parts = []
+        
+        if job is not None and self.is_downloading and job.get('estimate'):
+            elapsed = time.time() - job.get('started', time.time())
+            job_remaining = max(job['estimate'] - elapsed, 0)
+            remaining += job_remaining
+            parts.append(f"current job ~{self.format_duration(job_remaining)}")
+        
+        estimates = [entry[-1].get('estimate') for entry in self.job_queue]
+        known = [estimate for estimate in estimates if estimate]
+        if estimates:
+            remaining += sum(known)
+            unknown = len(estimates) - len(known)
+            queue_text = f"queue ({len(estimates)} waiting) ~{self.format_duration(remaining)}"
+            if unknown:
+                queue_text += f" + {unknown} without estimate"
+            parts.append(queue_text)
+        
+        self.eta_var.set(("Estimated time left: " + ", ".join(parts)) if parts else "")
+    
+    def format_duration(self, seconds):
+        """Format seconds as e.g. '1h 05m', '4m 10s' or '12s'"""
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+        if seconds >= 60:
+            return f"{seconds // 60}m {seconds % 60:02d}s"
+        return f"{seconds}s"
+    
+    def record_history(self, job):
+        """Add a finished job's timings to the history store"""
+        try:
+            if job is None or 'started' not in job or job['paused']:
+                return
+            verified = [output for output in job['outputs'] if output['verified']]
+            if not verified:
+                return
+            
+            finished = time.time()
+            fetch_finished = job.get('fetch_finished') or finished
+            merge_started = min(job.get('merge_started') or fetch_finished, fetch_finished)
+            size = sum(output['size'] for output in verified)
+            download_seconds = max(merge_started - job['started'], 0.001)
+            
+            # Merging inside yt-dlp's fetch, plus the merge and post-process stages
+            stage_seconds = job.get('stage_seconds', {})
+            merge_seconds = (fetch_finished - merge_started + stage_seconds.get('merge', 0)
+                             + stage_seconds.get('post-process', 0))
+            
+            self.history.add({
+                'time': finished,
+                'host': urlparse(job['url']).hostname or '',
+                'kind': self.job_kind(job),
+                'format': job['format'],
+                'size': size,
+                'download_seconds': round(download_seconds, 3),
+                'merge_seconds': round(merge_seconds, 3),
+                'throughput': size / download_seconds,
+                'stages': {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()}
+            })
+        except Exception as e:
+            print(f"Error recording history: {e}")
+    
+    def release_endpoint(self, job):
+        """Report a finished job's throughput or route failure to the proxy pool"""
+        try:
+            if job is None or 'endpoint' not in job:
+                return
+            endpoint = job.pop('endpoint')
+            
+            if job['paused']:
+                note = self.proxy_pool.release(endpoint)
+            elif job.get('fetched_size'):
+                fetch_finished = job.get('fetch_finished') or time.time()
+                merge_started = min(job.get('merge_started') or fetch_finished, fetch_finished)
+                note = self.proxy_pool.release(endpoint, job['fetched_size'], merge_started - job['started'])
+            else:
+                note = self.proxy_pool.release(endpoint, failed=job.get('failure') in PROXY_FAILURES)
+            if note:
+                self.log(note)
+        except Exception as e:
+            print(f"Error updating proxy pool: {e}")
+    
+    def parse_time_window(self, text):
+        """Parse 'HH:MM-HH:MM' into (start, end) minutes after midnight"""
+        match = re.fullmatch(r'\s*(\d{1,2})(?::(\d{2}))?\s*-\s*(\d{1,2})(?::(\d{2}))?\s*', text)
+        if not match:
+            raise ValueError("expected a range like 22:00-06:00")
+        
+        if int(match.group(2) or 0) > 59 or int(match.group(4) or 0) > 59:
+            raise ValueError("minutes must be between 00 and 59")
+        start = int(match.group(1)) * 60 + int(match.group(2) or 0)
+        end = int(match.group(3)) * 60 + int(match.group(4) or 0)
+        if start >= 24 * 60 or end > 24 * 60:
+            raise ValueError("hours must be between 00:00 and 24:00")
+        return start, end
+    
+    def in_off_peak_window(self):
+        """Check whether the current time falls inside the off-peak hours"""
+        try:
+            start, end = self.parse_time_window(self.off_peak_hours_var.get())
+        except ValueError:
+            return False
+        
+        now = time.localtime()
+        minutes = now.tm_hour * 60 + now.tm_min
+        if start <= end:
+            return start <= minutes < end
+        # Window wraps past midnight
+        return minutes >= start or minutes < end
+    
+    def job_can_start(self, job):
+        """Urgent and normal jobs start any time, off-peak jobs only inside the window
+        
+        Jobs waiting out a retry backoff don't start before it has passed.
+        """
+        if time.time() < job.get('not_before', 0):
+            return False
+        return not job['off_peak'] or self.in_off_peak_window()
+    
+    def schedule_jobs(self):
+        """Start, pause and resume queued jobs (runs periodically on the Tk loop)"""
+        try:
+            busy = self.download_thread is not None and self.download_thread.is_alive()
+            job = self.current_job
+            
+            if busy and job and not job['paused']:
+                waiting = [entry for entry in sorted(self.job_queue) if self.job_can_start(entry[-1])]
+                if not self.job_can_start(job):
+                    self.pause_current_job("off-peak window closed")
+                elif waiting and waiting[0][0] < JOB_PRIORITIES[job['priority']]:
+                    self.pause_current_job(f"{waiting[0][-1]['priority'].lower()} job waiting")
+            elif not busy:
+                if job and job['paused']:
+                    # Resume later from the partial file instead of starting over
+                    job['paused'] = False
+                    job['force'] = False
+                    self.push_job(job)
+                self.current_job = None
+                
+                for entry in sorted(self.job_queue):
+                    if self.job_can_start(entry[-1]):
+                        self.job_queue.remove(entry)
+                        heapq.heapify(self.job_queue)
+                        self.update_queue_list()
+                        self.start_job(entry[-1])
+                        break
+            
+            self.update_eta()
+        except Exception as e:
+            print(f"Scheduler error: {e}")
+        finally:
+            self.root.after(SCHEDULER_INTERVAL_MS, self.schedule_jobs)
+    
+    def start_job(self, job):
+        """Start a queued job from its own settings"""
+        self.log(f"Starting queued [{job['priority']}] job: {job['url']}")
+        self.run_job(job)
+    
+    def pause_current_job(self, reason):
+        """Stop the running job and put it back in the queue"""
+        self.current_job['paused'] = True
+        self.log(f"Pausing [{self.current_job['priority']}] job ({reason}) - it will resume later")
+        self.is_downloading = False
+        self.status_var.set("Paused")
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.terminate()
+            except Exception as e:
+                print(f"Error terminating process: {e}")
+    
+    def cancel_download(self):
+        """Cancel download"""
+        if self.is_downloading:
+            self.is_downloading = False
+            self.status_var.set("Cancelling...")
+            self.log("Download cancelled by user")
+            
+            # Terminate process if running
+            if self.process and self.process.poll() is None:
+                try:
                     self.process.terminate()
                 except Exception as e:
                     print(f"Error terminating process: {e}")
     
     def retry_download(self):
         """Retry the last download"""
-        if hasattr(self, 'last_url') and self.last_url:
+        if self.last_failed_job:
+            job = self.last_failed_job
+            self.last_failed_job = None
+            self.log("Retrying failed download - resuming from any partial files...")
+            job['retries'] = {}
+            job['not_before'] = 0
+            job['force'] = False
+            job['priority'] = "Urgent"
+            job['interactive'] = True
+            self.push_job(job)
+            self.retry_btn.config(state="disabled")
+        elif hasattr(self, 'last_url') and self.last_url:
             self.log("Retrying download with network recovery...")
             self.url_var.set(self.last_url)
             self.start_download()
@@ -553,37 +2293,38 @@ OR use chocolatey:
         self.is_downloading = False
         self.download_btn.config(state="normal")
         self.cancel_btn.config(state="disabled")
-        self.retry_btn.config(state="disabled")
+        self.retry_btn.config(state="normal" if self.last_failed_job else "disabled")
         self.progress_var.set(0)
     
     def download_video(self, url, download_path):
-        """Download video in separate thread with audio merging for high-res formats"""
+        """Run the current job through the download pipeline
+        
+        Resolve and fetch run on this thread. The later stages carry on in the
+        pipeline workers, so the next queued job can start downloading.
+        """
+        job = self.current_job
         try:
             # Store the URL for retry functionality
             self.last_url = url
+            self.recent_output.clear()
+            job['started'] = time.time()
+            for key in ('merge_started', 'fetch_finished', 'failure', 'fetched_size', 'streams', 'requeue', 'result'):
+                job.pop(key, None)
+            job['fetched'] = []
+            job['outputs'] = []
+            job['stage_seconds'] = {}
             self.log(f"Starting download: {url}")
             self.log(f"Download path: {download_path}")
-            self.log(f"Selected format: {self.selected_format.get()}")
-            
-            # Check if we need to merge audio (for high-res formats)
-            selected_format = self.selected_format.get()
-            optimized_format = self.get_optimized_format(selected_format)
-            needs_audio_merge = self.needs_audio_merge(optimized_format)
-            
-            if needs_audio_merge:
-                self.log("High-resolution format detected - will download video and audio separately, then merge")
-                self.download_with_audio_merge(url, download_path, optimized_format)
-            else:
-                self.log("Standard format - downloading directly")
-                self.download_standard(url, download_path, optimized_format)
-                
-        except Exception as e:
-            self.log(f"Download error: {e}")
-            self.status_var.set("Download failed!")
-            try:
-                messagebox.showerror("Error", f"Download failed: {e}")
-            except Exception as e2:
-                print(f"Error showing error message: {e2}")
+            self.log(f"Selected format: {job['format']}")
+            
+            self.pipeline.run(job, [
+                ('resolve', self.resolve_job),
+                ('fetch', self.fetch_job),
+                ('merge', self.merge_job),
+                ('post-process', self.post_process_job),
+                ('verify', self.verify_job),
+                ('index', self.index_job)
+            ], finish=self.finish_job)
         
         finally:
             # Cleanup
@@ -593,9 +2334,159 @@ OR use chocolatey:
                 except Exception as e:
                     print(f"Error terminating process: {e}")
             
+            if self.profiler:
+                self.profiler.end_phase()
+            self.release_endpoint(job)
             self.reset_buttons()
     
-    def needs_audio_merge(self, format_id):
+    def on_stage_done(self, stage, job, wait, wall, cpu):
+        """Pipeline hook: keep each job's stage times and feed --profile mode"""
+        stage_seconds = job.setdefault('stage_seconds', {})
+        stage_seconds[stage] = stage_seconds.get(stage, 0) + wall
+        if stage == 'fetch':
+            job['fetch_finished'] = time.time()
+        
+        if self.profiler:
+            self.profiler.record('pipeline', stage, wall, cpu)
+            if wait >= 0.001:
+                self.profiler.record('pipeline', f"{stage} (queued)", wait, 0.0)
+    
+    def finish_job(self, job, error):
+        """Wrap up a job once it leaves the pipeline"""
+        if error is not None:
+            self.log(f"Download error: {error}")
+            self.set_job_status(job, "Download failed!")
+            job['result'] = ('error', "Error", f"Download failed: {error}")
+        
+        self.record_history(job)
+        if job.pop('requeue', False):
+            self.root.after(0, self.push_job, job)
+        
+        result = job.pop('result', None)
+        if result:
+            self.report_result(job, *result)
+    
+    def report_result(self, job, kind, title, message):
+        """Show a job's outcome in a dialog on the Tk thread
+        
+        Queued jobs only log their outcome, so an unattended queue moves on
+        instead of waiting for someone to close a dialog.
+        """
+        if job.get('interactive'):
+            self.root.after(0, self.show_dialog, kind, title, message)
+    
+    def show_dialog(self, kind, title, message):
+        show = {'info': messagebox.showinfo, 'warning': messagebox.showwarning, 'error': messagebox.showerror}[kind]
+        try:
+            show(title, message)
+        except Exception as e:
+            print(f"Error showing {kind} message: {e}")
+    
+    def set_job_status(self, job, text):
+        """Show a job's status unless another job has taken over the status line"""
+        if self.current_job is job or not self.is_downloading:
+            self.status_var.set(text)
+    
+    def classify_failure(self, lines):
+        """Sort a failed run into a failure class from its output"""
+        errors = [line for line in lines if 'ERROR' in line or 'Error' in line] or list(lines)
+        text = "\n".join(errors[-10:])
+        for failure, patterns in FAILURE_PATTERNS:
+            if any(pattern in text for pattern in patterns):
+                return failure
+        return 'unknown'
+    
+    def handle_failure(self, job):
+        """Classify a failed download and queue a retry according to its policy
+        
+        Returns True if a retry was queued.
+        """
+        failure = self.classify_failure(self.recent_output)
+        self.log(f"Failure class: {FAILURE_DESCRIPTIONS[failure]}")
+        job['failure'] = failure
+        max_retries, backoff = RETRY_POLICIES[failure]
+        retries = job.setdefault('retries', {})
+        retries[failure] = retries.get(failure, 0) + 1
+        attempt = retries[failure]
+        
+        if failure == 'disk_full':
+            self.log("Free up disk space, then use Retry Download to resume")
+            return False
+        if failure == 'video_unavailable':
+            self.log("Retrying won't help until the video is available again")
+            return False
+        if attempt > max_retries:
+            self.log("No automatic retries left for this kind of failure")
+            return False
+        
+        if failure == 'expired':
+            # Stream URLs are only worth re-extracting when they were rejected
+            self.invalidate_info_json(job['url'])
+        elif failure == 'format_unavailable':
+            # Audio-only jobs select their stream with the audio quality, not the format
+            field = 'audio_quality' if job['audio_only'] else 'format'
+            fallback = self.get_fallback_format(job)
+            if not fallback:
+                self.log("No other format left to fall back to")
+                return False
+            self.log(f"Falling back from format {job[field]} to {fallback}")
+            job.setdefault('failed_formats', []).append(job[field])
+            job[field] = fallback
+            job['renditions'] = []
+        
+        # Keep partial files and fragments so the retry resumes from them
+        job['force'] = False
+        delay = min(backoff * 2 ** (attempt - 1), MAX_RETRY_BACKOFF)
+        job['not_before'] = time.time() + delay
+        self.root.after(0, self.push_job, job)
+        self.log(f"Retry {attempt} of {max_retries} queued" + (f" in {delay}s" if delay else ""))
+        return True
+    
+    def get_fallback_format(self, job):
+        """Return the next-best ranked format after the job's current one
+        
+        Video-only formats are paired with the job's audio quality so the
+        fallback still has sound. Audio-only jobs step through audio selectors.
+        """
+        if job['audio_only']:
+            tried = set(job.get('failed_formats', [])) | {job['audio_quality']}
+            for selector in ('bestaudio', 'best'):
+                if selector not in tried:
+                    return selector
+            return None
+        
+        # Compare bare format IDs - earlier fallbacks look like '247+bestaudio/best'
+        current = job['format'].split('+', 1)[0]
+        tried = {selector.split('+', 1)[0] for selector in job.get('failed_formats', []) + [job['format']]}
+        cached = self.info_cache.get(job['url'])
+        if not cached:
+            return 'best' if 'best' not in tried else None
+        
+        ranked = sorted((fmt for fmt in cached['info'].get('formats') or []
+                         if fmt.get('vcodec') not in (None, 'none')),
+                        key=lambda fmt: (fmt.get('height') or 0, fmt.get('tbr') or 0), reverse=True)
+        ranked_ids = [fmt.get('format_id') for fmt in ranked]
+        video_only = {fmt.get('format_id') for fmt in ranked if fmt.get('acodec') == 'none'}
+        
+        if current in ranked_ids:
+            # Only step down from the format that failed
+            ranked_ids = ranked_ids[ranked_ids.index(current) + 1:]
+        elif 'best' not in tried:
+            # A selector like best[height<=720] matched nothing - let yt-dlp pick
+            return 'best'
+        for format_id in ranked_ids:
+            if format_id not in tried:
+                if format_id in video_only:
+                    return f"{format_id}+{job['audio_quality']}/best"
+                return format_id
+        return 'best' if 'best' not in tried else None
+    
+    def get_job_formats(self, job):
+        """Return the format list resolved for a job's URL, or [] before Get Formats has run"""
+        cached = self.info_cache.get(job['url'])
+        return self.parse_formats(cached['info']) if cached else []
+    
+    def needs_audio_merge(self, format_id, formats):
         """Check if format needs audio merging (high-res formats)"""
         # High-resolution formats that typically need audio merging
         high_res_formats = ['137', '299', '298', '136', '135', '134', '133', '160', '248', '271', '272', '313', '315', '308']
@@ -605,7 +2496,7 @@ OR use chocolatey:
             return True
         
         # Check if any available format contains high-res info
-        for format_info in self.available_formats:
+        for format_info in formats:
             if format_info['id'] == format_id:
                 resolution = format_info.get('resolution', '').lower()
                 if any(res in resolution for res in ['1080', '1440', '2160', '4k']):
@@ -614,272 +2505,757 @@ OR use chocolatey:
         
         return False
     
-    def get_optimized_format(self, format_id):
+    def get_optimized_format(self, job, formats):
         """Get optimized format for faster downloads if enabled"""
-        if self.fast_download_var.get():
+        format_id = job['format']
+        if job['fast_download']:
             # For fast downloads, prefer smaller formats
             if format_id in ['271', '272', '313', '315', '308']:  # 1440p, 4K formats
                 # Try to find 1080p alternative
-                for format_info in self.available_formats:
+                for format_info in formats:
                     if format_info['id'] == '248' and '1080' in format_info.get('resolution', ''):
                         self.log(f"Fast download: Using 1080p instead of {format_id} for speed")
                         return '248'
             elif format_id in ['137', '299', '298']:  # 1080p formats
                 # Try to find 720p alternative
-                for format_info in self.available_formats:
+                for format_info in formats:
                     if format_info['id'] in ['136', '135'] and '720' in format_info.get('resolution', ''):
                         self.log(f"Fast download: Using 720p instead of {format_id} for speed")
                         return format_info['id']
         
         return format_id
     
-    def download_with_audio_merge(self, url, download_path, video_format):
-        """Download video and audio separately, then merge them"""
-        try:
-            # Use custom filename if provided, otherwise use video title
-            custom_filename = self.filename_var.get().strip()
-            if custom_filename:
-                # Clean filename and add extension
-                import re
-                clean_filename = re.sub(r'[<>:"/\\|?*]', '_', custom_filename)
-                output_template = os.path.join(download_path, f'{clean_filename}.%(ext)s')
-                self.log(f"Using custom filename: {clean_filename}")
+    def get_output_template(self, job):
+        """Build the output template from the job's custom filename or the video title"""
+        custom_filename = job['filename']
+        if custom_filename:
+            # Clean filename and add extension
+            name = re.sub(r'[<>:"/\\|?*]', '_', custom_filename)
+            self.log(f"Using custom filename: {name}")
+        else:
+            name = '%(title)s'
+            self.log("Using video title as filename")
+        
+        if self.get_sections(job):
+            # One file per clip section
+            name += ' [%(section_start)d-%(section_end)d]'
+        return os.path.join(job['download_path'], f'{name}.%(ext)s')
+    
+    def parse_timestamp(self, text):
+        """Parse '[[H:]M:]S' into seconds"""
+        parts = text.strip().split(':')
+        if len(parts) > 3:
+            raise ValueError(f"'{text.strip()}' is not a time")
+        
+        seconds = 0.0
+        for index, part in enumerate(parts):
+            # Plain digits only - float() would also take 'nan', '1e2' and '-1'
+            if not re.fullmatch(r'\d+(\.\d+)?', part.strip()):
+                raise ValueError(f"'{text.strip()}' is not a time")
+            value = float(part)
+            if index and value >= 60:
+                raise ValueError(f"'{text.strip()}': minutes and seconds must be below 60")
+            seconds = seconds * 60 + value
+        return seconds
+    
+    def parse_sections(self, text):
+        """Parse '1:00-1:30, 5:00-5:20' into [(60.0, 90.0), (300.0, 320.0)]"""
+        sections = []
+        for chunk in re.split(r'[,;]', text):
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+            if '-' not in chunk:
+                raise ValueError(f"'{chunk}' is not a start-end range")
+            
+            start_text, end_text = chunk.split('-', 1)
+            start, end = self.parse_timestamp(start_text), self.parse_timestamp(end_text)
+            if end <= start:
+                raise ValueError(f"'{chunk}' ends before it starts")
+            sections.append((start, end))
+        return sections
+    
+    def get_sections(self, job):
+        """Return the job's clip sections, or [] for the whole video"""
+        try:
+            return self.parse_sections(job['sections'])
+        except ValueError:
+            return []
+    
+    def get_section_options(self, job):
+        """Return the yt-dlp options that limit the download to the clip sections"""
+        sections = self.get_sections(job)
+        if not sections:
+            return []
+        
+        options = []
+        for start, end in sections:
+            options.extend(['--download-sections', f'*{start:.3f}-{end:.3f}'])
+        
+        if job['precise_cuts']:
+            options.append('--force-keyframes-at-cuts')
+            self.log(f"Downloading {len(sections)} clip section(s) with precise cuts (re-encoded)")
+        else:
+            self.log(f"Downloading {len(sections)} clip section(s) - cut at keyframes with stream copy")
+        return options
+    
+    def get_proxy_options(self, job):
+        """Return the yt-dlp option routing a job through its endpoint"""
+        endpoint = job.get('endpoint')
+        return ['--proxy', endpoint] if endpoint else []
+    
+    def get_speed_options(self, job):
+        """Return the yt-dlp speed options if speed boost is enabled"""
+        if not job['speed_boost']:
+            return []
+        
+        self.log("Speed boost enabled - using 8 concurrent downloads with ZERO sleep timers")
+        return [
+            '--concurrent-fragments', '8',
+            '--fragment-retries', '10',
+            '--retries', '10',
+            '--socket-timeout', '120',
+            '--buffer-size', '16K',
+            '--http-chunk-size', '10M',
+            '--sleep-requests', '0',
+            '--sleep-interval', '0',
+            '--max-sleep-interval', '0'
+        ]
+    
+    def resolve_job(self, job):
+        """Pipeline stage: pick the network route, download kind and output name"""
+        job['endpoint'] = self.proxy_pool.acquire()
+        if len(self.proxy_pool) > 1 or job['endpoint']:
+            self.log(f"Network route: {self.proxy_pool.label(job['endpoint'])}")
+        
+        if job['audio_only']:
+            self.log("Audio only - the video stream will not be downloaded")
+            job['kind'] = 'audio'
+        elif len(job['renditions']) > 1:
+            self.log("Multiple renditions selected - audio will be fetched once and reused")
+            if job['sections']:
+                self.log("Clip sections don't apply to multi-rendition exports - exporting full renditions")
+            job['kind'] = 'renditions'
+            self.check_library_folder(job)
+            return True
+        else:
+            # Check if we need to merge audio (for high-res formats)
+            formats = self.get_job_formats(job)
+            job['selector'] = self.get_optimized_format(job, formats)
+            if self.needs_audio_merge(job['selector'], formats):
+                self.log("High-resolution format detected - will download video and audio separately, then merge")
+                job['kind'] = 'merge'
             else:
-                output_template = os.path.join(download_path, '%(title)s.%(ext)s')
-                self.log("Using video title as filename")
-            
-            # Step 1: Download video and audio separately with speed optimizations
-            audio_quality = self.audio_quality_var.get()
-            self.log(f"Step 1: Downloading video and audio separately with speed optimizations...")
-            self.log(f"Video format: {video_format}, Audio quality: {audio_quality}")
-            
-            cmd = [
-                'yt-dlp',
-                '-o', output_template,
-                '--progress',
-                '--newline',
-                '--no-playlist',
-                '--format', f'{video_format}+{audio_quality}/best',
-                '--merge-output-format', 'mp4',
-                '--embed-metadata',
-                url
-            ]
-            
-            # Add speed optimizations if enabled
-            if self.speed_boost_var.get():
-                cmd.extend([
-                    '--concurrent-fragments', '8',
-                    '--fragment-retries', '10',
-                    '--retries', '10',
-                    '--socket-timeout', '120',
-                    '--buffer-size', '16K',
-                    '--http-chunk-size', '10M',
-                    '--sleep-requests', '0',
-                    '--sleep-interval', '0',
-                    '--max-sleep-interval', '0'
-                ])
-                self.log("Speed boost enabled - using 8 concurrent downloads with ZERO sleep timers")
-            
-            # Add force overwrite if checkbox is checked
-            if self.force_download_var.get():
-                cmd.insert(-1, '--force-overwrites')
-                self.log("Force download enabled - will overwrite existing files")
-            
-            self.log(f"Command: {' '.join(cmd)}")
-            
-            # Execute download
-            self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                          universal_newlines=True, bufsize=1)
-            
-            for line in self.process.stdout:
-                if not self.is_downloading:
-                    break
-                
-                line = line.strip()
-                if line:
-                    self.log(line)
-                    
-                    # Parse progress
-                    if '[download]' in line and '%' in line:
-                        try:
-                            percent_str = line.split('%')[0].split()[-1]
-                            percent = float(percent_str)
-                            self.progress_var.set(percent)
-                            self.status_var.set(f"Downloading & merging... {percent:.1f}%")
-                        except (ValueError, IndexError):
-                            pass
-            
-            if self.is_downloading:
-                self.process.wait()
-                
-                if self.process.returncode == 0:
-                    self.status_var.set("Download completed!")
-                    self.log("Download and merge completed successfully!")
-                    
-                    # Find the downloaded file
-                    downloaded_file = self.find_downloaded_file(download_path)
-                    if downloaded_file:
-                        file_size = os.path.getsize(downloaded_file)
-                        self.log(f"File saved to: {downloaded_file}")
-                        self.log(f"File size: {file_size:,} bytes ({file_size/1024/1024:.2f} MB)")
-                        
-                        if file_size > 0:
-                            self.log("High-quality video with audio successfully downloaded and merged!")
-                            try:
-                                messagebox.showinfo("Success", f"Download completed!\n\nFile saved to:\n{downloaded_file}\n\nFile size: {file_size/1024/1024:.2f} MB\n\nVideo and audio have been merged successfully!")
-                            except Exception as e:
-                                print(f"Error showing success message: {e}")
-                        else:
-                            self.log("WARNING: Downloaded file is empty (0 bytes)")
-                            try:
-                                messagebox.showwarning("Warning", "Download completed but file is empty.\nThis might indicate a download issue.\nCheck the log for details.")
-                            except Exception as e:
-                                print(f"Error showing warning message: {e}")
-                    else:
-                        self.log("Download completed but file location not found")
-                        self.log("This might indicate a download issue.")
-                        try:
-                            messagebox.showwarning("Warning", "Download completed but file not found.\nThis might indicate a download issue.\nCheck the log for details.")
-                        except Exception as e:
-                            print(f"Error showing warning message: {e}")
-                else:
-                    self.status_var.set("Download failed!")
-                    self.log("Download failed!")
-                    try:
-                        messagebox.showerror("Error", "Download failed! Check log for details.")
-                    except Exception as e:
-                        print(f"Error showing error message: {e}")
+                self.log("Standard format - downloading directly")
+                job['kind'] = 'standard'
+        
+        # Use custom filename if provided, otherwise use video title
+        job['output_template'] = self.get_output_template(job)
+        self.check_library_folder(job)
+        return True
+    
+    def fetch_job(self, job):
+        """Pipeline stage: download the job's streams
+        
+        yt-dlp merges and post-processes single downloads itself while
+        fetching. Returns False if the job ends here.
+        """
+        if job['kind'] == 'renditions':
+            return self.fetch_renditions(job)
+        
+        # Single-file formats can be fetched over several connections at once
+        if job['kind'] == 'standard' and job['multi_connection'] and not job['sections'] and not job['endpoint']:
+            output_file = self.download_ranged(job)
+            if not self.is_downloading:
+                return self.fetch_cancelled(job)
+            if output_file:
+                self.set_fetched(job, [output_file])
+                return True
+        
+        # Reuse the info resolved by "Get Formats" while its stream URLs are valid
+        source_args = self.get_download_source(job['url'])
+        returncode, output_record = self.run_fetch_command(job, source_args)
+        if (returncode not in (0, None) and '--load-info-json' in source_args
+                and self.classify_failure(self.recent_output) == 'expired'):
+            # Other failures are retried (with backoff) by handle_failure
+            self.log("Cached stream URLs were rejected - retrying with fresh extraction")
+            self.invalidate_info_json(job['url'])
+            returncode, output_record = self.run_fetch_command(job, [job['url']])
+        
+        if returncode is None:
+            return self.fetch_cancelled(job)
+        if returncode != 0:
+            return self.fetch_failed(job, "Download failed!")
+        
+        self.status_var.set("Download completed!")
+        self.log("Download completed successfully!")
+        
+        # Find the downloaded files
+        outputs = self.read_output_record(output_record)
+        if not outputs and job['kind'] != 'audio':
+            latest_file = self.find_downloaded_file(job['download_path'])
+            outputs = [latest_file] if latest_file else []
+        if not outputs:
+            self.log("Download completed but file location not found")
+            self.log("This might indicate a download issue.")
+            job['result'] = ('warning', "Warning", "Download completed but file not found.\nThis might indicate a download issue.\nCheck the log for details.")
+            return False
+        
+        self.set_fetched(job, outputs)
+        return True
+    
+    def run_fetch_command(self, job, source_args):
+        """Run the job's yt-dlp command and return (exit code, output record path)"""
+        output_record = self.new_output_record()
+        cmd = self.build_command(job, output_record, source_args)
+        status_text = {'merge': "Downloading & merging...", 'audio': "Downloading audio..."}.get(
+            job['kind'], "Downloading...")
+        return self.run_yt_dlp(cmd, status_text), output_record
+    
+    def build_command(self, job, output_record, source_args):
+        """Build the yt-dlp command for a job - every download option is added here"""
+        cmd = [
+            *YT_DLP_COMMAND,
+            '-o', job['output_template'],
+            '--progress',
+            '--newline',
+            '--no-playlist'
+        ]
+        
+        if job['kind'] == 'merge':
+            self.log(f"Video format: {job['selector']}, Audio quality: {job['audio_quality']}")
+            cmd.extend(['--format', f"{job['selector']}+{job['audio_quality']}/best",
+                        '--merge-output-format', 'mp4',
+                        '--embed-metadata'])
+        elif job['kind'] == 'audio':
+            audio_quality, audio_format = job['audio_quality'], job['audio_format']
+            
+            # Prefer a stream already in the target codec so extraction is a plain remux
+            if audio_format == 'm4a':
+                format_selector = f"{audio_quality}[ext=m4a]/{audio_quality}"
+            elif audio_format == 'opus':
+                format_selector = f"{audio_quality}[acodec=opus]/{audio_quality}"
             else:
-                self.status_var.set("Download cancelled!")
-                self.log("Download cancelled by user")
-                
+                format_selector = audio_quality
+            
+            # MP3 is encoded in the post-process stage, so the next download isn't held up
+            extract_format = 'best' if audio_format == 'mp3' else audio_format
+            self.log(f"Audio quality: {audio_quality}, output: {audio_format}")
+            cmd.extend(['--format', format_selector,
+                        '--extract-audio',
+                        '--audio-format', extract_format,
+                        '--embed-metadata'])
+        else:
+            cmd.extend(['--format', job['selector']])
+        
+        # Add speed optimizations if enabled
+        cmd.extend(self.get_speed_options(job))
+        cmd.extend(self.get_proxy_options(job))
+        cmd.extend(self.get_section_options(job))
+        
+        # Add force overwrite if checkbox is checked
+        if job['force']:
+            cmd.append('--force-overwrites')
+            self.log("Force download enabled - will overwrite existing files")
+        
+        # Have yt-dlp record the final output paths instead of guessing them afterwards
+        cmd.extend(['--print-to-file', 'after_move:filepath', output_record])
+        cmd.extend(source_args)
+        return cmd
+    
+    def fetch_renditions(self, job):
+        """Fetch the shared audio stream and each rendition's video stream into the stream cache"""
+        cached = self.info_cache.get(job['url'])
+        video_id = (cached['info'].get('id') if cached else None) or job['url']
+        self.prune_stream_cache()
+        
+        # One audio fetch shared by every rendition
+        self.log(f"Fetching audio stream ({job['audio_quality']})...")
+        audio_file = self.fetch_stream(job, video_id, job['audio_quality'])
+        if not self.is_downloading:
+            return self.fetch_cancelled(job)
+        if not audio_file:
+            return self.fetch_failed(job, "Audio stream could not be fetched!")
+        
+        streams = []
+        for index, video_format in enumerate(job['renditions'], start=1):
+            if not self.is_downloading:
+                return self.fetch_cancelled(job)
+            
+            self.log(f"Fetching video stream {index} of {len(job['renditions'])}: {video_format}...")
+            video_file = self.fetch_stream(job, video_id, video_format)
+            if video_file:
+                streams.append((video_format, video_file))
+            elif self.is_downloading:
+                self.log(f"Skipping rendition {video_format} - video stream could not be fetched")
+        
+        if not self.is_downloading:
+            return self.fetch_cancelled(job)
+        if not streams:
+            return self.fetch_failed(job, "No renditions could be fetched!")
+        
+        job['streams'] = (audio_file, streams)
+        job['fetched_size'] = sum(os.path.getsize(path) for path in [audio_file] + [path for _, path in streams])
+        self.status_var.set(f"Fetched {len(streams)} renditions - remuxing...")
+        return True
+    
+    def set_fetched(self, job, outputs):
+        """Store the files a fetch produced for the later stages"""
+        job['fetched'] = outputs
+        job['fetched_size'] = 0
+        for output_file in outputs:
+            file_size = os.path.getsize(output_file)
+            job['fetched_size'] += file_size
+            self.log(f"File saved to: {output_file}")
+            self.log(f"File size: {file_size:,} bytes ({file_size/1024/1024:.2f} MB)")
+    
+    def fetch_cancelled(self, job):
+        """Report a cancelled or paused fetch - returns False to end the job"""
+        if job['paused']:
+            # The scheduler re-queues paused jobs once the download thread ends
+            self.status_var.set("Paused - re-queued")
+            self.log("Download paused and re-queued - it will resume from the partial file")
+            return False
+        
+        self.status_var.set("Download cancelled!")
+        self.log("Download cancelled by user")
+        return False
+    
+    def fetch_failed(self, job, message):
+        """Report a failed fetch and queue a retry if its failure class allows one"""
+        self.status_var.set("Download failed!")
+        self.log(message)
+        if not self.handle_failure(job):
+            # Only offer a manual retry once no automatic one is queued
+            self.last_failed_job = job
+            job['result'] = ('error', "Error", "Download failed! Check log for details.")
+        return False
+    
+    def merge_job(self, job):
+        """Pipeline stage: remux fetched rendition streams
+        
+        Other kinds are merged by yt-dlp during the fetch, so there is nothing
+        left to do for them here.
+        """
+        if job['kind'] != 'renditions':
+            return True
+        
+        cached = self.info_cache.get(job['url'])
+        info = cached['info'] if cached else {}
+        heights = {fmt.get('format_id'): fmt.get('height') for fmt in info.get('formats') or []}
+        base_name = re.sub(r'[<>:"/\\|?*]', '_', job['filename'] or info.get('title') or info.get('id') or 'video')
+        audio_file, streams = job['streams']
+        self.log(f"Exporting {len(streams)} renditions as: {base_name}")
+        
+        # Renditions of the same height (e.g. H.264 and VP9) also get their format ID
+        selected_heights = [heights.get(video_format) for video_format, _ in streams]
+        exported = 0
+        for video_format, video_file in streams:
+            height = heights.get(video_format)
+            if not height:
+                label = video_format
+            elif selected_heights.count(height) > 1:
+                label = f"{height}p {video_format}"
+            else:
+                label = f"{height}p"
+            output_file = self.remux_streams(video_file, audio_file,
+                                             os.path.join(job['download_path'], f"{base_name} [{label}]"), job)
+            if output_file:
+                job['fetched'].append(output_file)
+                exported += 1
+        
+        if exported == len(streams):
+            # Every rendition is exported - keep cached streams only for retries
+            for path in [audio_file] + [video_file for _, video_file in streams]:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Error removing cached stream: {e}")
+        
+        if not job['fetched']:
+            self.set_job_status(job, "Download failed!")
+            self.log("No renditions could be exported!")
+            job['result'] = ('error', "Error", "Download failed! Check log for details.")
+            return False
+        return True
+    
+    def post_process_job(self, job):
+        """Pipeline stage: encode audio-only MP3 jobs
+        
+        yt-dlp already applied its own post-processors during the fetch.
+        """
+        if job['kind'] == 'audio' and job['audio_format'] == 'mp3':
+            job['fetched'] = [self.transcode_to_mp3(path, job['force']) or path
+                              if not path.lower().endswith('.mp3') else path
+                              for path in job['fetched']]
+        return True
+    
+    def verify_job(self, job):
+        """Pipeline stage: verify every output and report the result"""
+        verified = [path for path in job['fetched'] if self.verify_download(path, job)]
+        if not verified:
+            self.set_job_status(job, "Download failed verification!")
+            self.log("WARNING: Downloaded file failed verification")
+            job['result'] = ('warning', "Warning", "Download completed but the file failed verification.\nThis might indicate a download issue.\nCheck the log for details.")
+            return False
+        
+        total_size = sum(os.path.getsize(path) for path in verified)
+        if len(verified) == 1:
+            message = f"Download completed!\n\nFile saved to:\n{verified[0]}\n\nFile size: {total_size/1024/1024:.2f} MB"
+        else:
+            message = (f"Download completed!\n\n{len(verified)} files saved to:\n{job['download_path']}\n\n"
+                       f"Total size: {total_size/1024/1024:.2f} MB")
+        if len(verified) < len(job['fetched']):
+            message += "\n\nSome files failed verification - check the log for details."
+        
+        if self.last_failed_job is job:
+            # Nothing left to retry
+            self.last_failed_job = None
+            self.root.after(0, lambda: self.retry_btn.config(state="disabled"))
+        
+        self.set_job_status(job, "Download completed!")
+        self.log(f"Job finished: {len(verified)} verified file(s). You can now download another video or close the application.")
+        job['result'] = ('info', "Success", message)
+        return True
+    
+    def transcode_to_mp3(self, source_file, overwrite):
+        """Encode an audio file to MP3 and remove the original
+        
+        Returns the MP3 path, or None if encoding failed.
+        """
+        output_file = os.path.splitext(source_file)[0] + '.mp3'
+        cmd = [
+            'ffmpeg',
+            '-y' if overwrite else '-n',
+            '-i', source_file,
+            '-vn',
+            '-map_metadata', '0',
+            '-codec:a', 'libmp3lame',
+            '-q:a', '2',
+            output_file
+        ]
+        
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True)
         except Exception as e:
-            self.log(f"Download with merge error: {e}")
-            self.status_var.set("Download failed!")
+            self.log(f"Error running ffmpeg: {e}")
+            return None
+        
+        if result.returncode != 0:
+            self.log(f"MP3 transcode failed for {source_file}: {result.stderr.strip()[-500:]}")
+            return None
+        
+        try:
+            os.remove(source_file)
+        except OSError as e:
+            print(f"Error removing transcode source: {e}")
+        self.log(f"MP3 ready: {output_file}")
+        return output_file
+    
+    def fetch_stream(self, job, video_id, format_selector):
+        """Fetch a single stream into the local stream cache and return its path"""
+        stream_dir = APP_DATA_DIR / "streams"
+        stream_dir.mkdir(parents=True, exist_ok=True)
+        stream_key = hashlib.sha1(f"{video_id}|{format_selector}".encode('utf-8')).hexdigest()
+        
+        cached_file = self.find_cached_stream(stream_dir, stream_key)
+        if cached_file:
+            self.log(f"Using cached stream for {format_selector}")
+            return cached_file
+        
+        cmd = [
+            *YT_DLP_COMMAND,
+            '-o', str(stream_dir / f"{stream_key}.%(ext)s"),
+            '--progress',
+            '--newline',
+            '--no-playlist',
+            '--format', format_selector
+        ]
+        cmd.extend(self.get_speed_options(job))
+        cmd.extend(self.get_proxy_options(job))
+        cmd.extend(self.get_download_source(job['url']))
+        
+        returncode = self.run_yt_dlp(cmd, f"Fetching {format_selector}...")
+        if returncode == 0:
+            return self.find_cached_stream(stream_dir, stream_key)
+        return None
+    
+    def find_cached_stream(self, stream_dir, stream_key):
+        """Return the completed cache file for a stream key, if any"""
+        for path in glob.glob(os.path.join(str(stream_dir), f"{stream_key}.*")):
+            if not path.endswith(('.part', '.ytdl')) and '.part-Frag' not in path:
+                return path
+        return None
+    
+    def prune_stream_cache(self):
+        """Delete cached streams that are too old to be worth keeping"""
+        stream_dir = APP_DATA_DIR / "streams"
+        if not stream_dir.exists():
+            return
+        
+        cutoff = time.time() - STREAM_CACHE_MAX_AGE
+        for path in stream_dir.iterdir():
             try:
-                messagebox.showerror("Error", f"Download failed: {e}")
-            except Exception as e2:
-                print(f"Error showing error message: {e2}")
-    
-    def download_standard(self, url, download_path, format_id):
-        """Download standard format (no audio merging needed)"""
-        try:
-            # Use custom filename if provided, otherwise use video title
-            custom_filename = self.filename_var.get().strip()
-            if custom_filename:
-                # Clean filename and add extension
-                import re
-                clean_filename = re.sub(r'[<>:"/\\|?*]', '_', custom_filename)
-                output_template = os.path.join(download_path, f'{clean_filename}.%(ext)s')
-                self.log(f"Using custom filename: {clean_filename}")
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError as e:
+                print(f"Error pruning stream cache: {e}")
+    
+    def remux_streams(self, video_file, audio_file, output_base, job):
+        """Mux a video and an audio stream into one file without re-encoding"""
+        video_ext = os.path.splitext(video_file)[1].lower()
+        audio_ext = os.path.splitext(audio_file)[1].lower()
+        container = 'mp4' if video_ext == '.mp4' and audio_ext in ('.m4a', '.mp4') else 'mkv'
+        output_file = f"{output_base}.{container}"
+        
+        cmd = [
+            'ffmpeg',
+            '-y' if job['force'] else '-n',
+            '-i', video_file,
+            '-i', audio_file,
+            '-map', '0:v:0',
+            '-map', '1:a:0',
+            '-c', 'copy',
+            output_file
+        ]
+        
+        if not job.get('merge_started'):
+            job['merge_started'] = time.time()
+        
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        except Exception as e:
+            self.log(f"Error running ffmpeg: {e}")
+            return None
+        
+        if result.returncode != 0:
+            if os.path.exists(output_file) and not job['force']:
+                self.log(f"Already exists, skipped: {output_file}")
             else:
-                output_template = os.path.join(download_path, '%(title)s.%(ext)s')
-                self.log("Using video title as filename")
-            cmd = [
-                'yt-dlp',
-                '-o', output_template,
-                '--progress',
-                '--newline',
-                '--no-playlist',
-                '--format', format_id,
-                url
-            ]
+                self.log(f"Remux failed for {output_file}: {result.stderr.strip()[-500:]}")
+            return None
+        
+        self.log(f"Remuxed (stream copy): {output_file}")
+        return output_file
+    
+    def run_yt_dlp(self, cmd, status_text):
+        """Run a yt-dlp command, logging its output and tracking progress
+        
+        Returns the exit code, or None if the download was cancelled.
+        """
+        # Proxy URLs can carry credentials - log them masked
+        shown = [self.proxy_pool.label(arg) if index and cmd[index - 1] == '--proxy' else arg
+                 for index, arg in enumerate(cmd)]
+        self.log(f"Command: {' '.join(shown)}")
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        universal_newlines=True, bufsize=1)
+        
+        for line in self.process.stdout:
+            if not self.is_downloading:
+                break
             
-            # Add speed optimizations if enabled
-            if self.speed_boost_var.get():
-                cmd.extend([
-                    '--concurrent-fragments', '8',
-                    '--fragment-retries', '10',
-                    '--retries', '10',
-                    '--socket-timeout', '120',
-                    '--buffer-size', '16K',
-                    '--http-chunk-size', '10M',
-                    '--sleep-requests', '0',
-                    '--sleep-interval', '0',
-                    '--max-sleep-interval', '0'
-                ])
-                self.log("Speed boost enabled - using 8 concurrent downloads with ZERO sleep timers")
-            
-            # Add force overwrite if checkbox is checked
-            if self.force_download_var.get():
-                cmd.insert(-1, '--force-overwrites')
-                self.log("Force download enabled - will overwrite existing files")
-            
-            self.log(f"Command: {' '.join(cmd)}")
-            
-            # Execute download
-            self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                          universal_newlines=True, bufsize=1)
-            
-            for line in self.process.stdout:
-                if not self.is_downloading:
-                    break
+            line = line.strip()
+            if line:
+                self.log(line)
+                self.handle_output_line(line)
                 
-                line = line.strip()
-                if line:
-                    self.log(line)
-                    
-                    # Parse progress
-                    if '[download]' in line and '%' in line:
-                        try:
-                            percent_str = line.split('%')[0].split()[-1]
-                            percent = float(percent_str)
-                            self.progress_var.set(percent)
-                            self.status_var.set(f"Downloading... {percent:.1f}%")
-                        except (ValueError, IndexError):
-                            pass
-            
-            if self.is_downloading:
-                self.process.wait()
-                
-                if self.process.returncode == 0:
-                    self.status_var.set("Download completed!")
-                    self.log("Download completed successfully!")
-                    
-                    # Find the downloaded file
-                    downloaded_file = self.find_downloaded_file(download_path)
-                    if downloaded_file:
-                        file_size = os.path.getsize(downloaded_file)
-                        self.log(f"File saved to: {downloaded_file}")
-                        self.log(f"File size: {file_size:,} bytes ({file_size/1024/1024:.2f} MB)")
-                        
-                        if file_size > 0:
-                            self.log("You can now download another video or close the application.")
-                            try:
-                                messagebox.showinfo("Success", f"Download completed!\n\nFile saved to:\n{downloaded_file}\n\nFile size: {file_size/1024/1024:.2f} MB\n\nApplication will remain open for more downloads.")
-                            except Exception as e:
-                                print(f"Error showing success message: {e}")
-                        else:
-                            self.log("WARNING: Downloaded file is empty (0 bytes)")
-                            try:
-                                messagebox.showwarning("Warning", "Download completed but file is empty.\nThis might indicate a download issue.\nCheck the log for details.")
-                            except Exception as e:
-                                print(f"Error showing warning message: {e}")
-                    else:
-                        self.log("Download completed but file location not found")
-                        self.log("This might indicate a download issue.")
-                        try:
-                            messagebox.showwarning("Warning", "Download completed but file not found.\nThis might indicate a download issue.\nCheck the log for details.")
-                        except Exception as e:
-                            print(f"Error showing warning message: {e}")
-                else:
-                    self.status_var.set("Download failed!")
-                    self.log("Download failed!")
+                # Parse progress
+                if '[download]' in line and '%' in line:
                     try:
-                        messagebox.showerror("Error", "Download failed! Check log for details.")
-                    except Exception as e:
-                        print(f"Error showing error message: {e}")
-            else:
-                self.status_var.set("Download cancelled!")
-                self.log("Download cancelled by user")
-                
+                        percent_str = line.split('%')[0].split()[-1]
+                        percent = float(percent_str)
+                        self.progress_var.set(percent)
+                        self.status_var.set(f"{status_text} {percent:.1f}%")
+                    except (ValueError, IndexError):
+                        pass
+        
+        if not self.is_downloading:
+            return None
+        
+        self.process.wait()
+        return self.process.returncode
+    
+    def download_ranged(self, job):
+        """Download a progressive format with the multi-connection engine
+        
+        Returns the output path, or None when the format can't be fetched this
+        way (or the download was cancelled) so the caller falls back to yt-dlp.
+        """
+        cached = self.info_cache.get(job['url'])
+        if not cached or time.time() >= cached['expires'] - INFO_JSON_EXPIRY_MARGIN:
+            self.log("Multi-connection download needs fresh format info - using yt-dlp instead")
+            return None
+        
+        # Let yt-dlp resolve the format and filename from the cached info (no network)
+        try:
+            cmd = [*YT_DLP_COMMAND, '--load-info-json', cached['path'], '--format', job['selector'],
+                   '-o', job['output_template'], '--dump-json']
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            selected = json.loads(result.stdout) if result.returncode == 0 else {}
+        except Exception as e:
+            self.log(f"Could not resolve format for multi-connection download: {e}")
+            return None
+        
+        if (selected.get('requested_formats') or not selected.get('url')
+                or selected.get('protocol') not in ('http', 'https')):
+            self.log("Format is not a single progressive file - using yt-dlp instead")
+            return None
+        
+        output_file = selected.get('filename') or selected.get('_filename')
+        if not output_file:
+            return None
+        if os.path.exists(output_file) and not job['force']:
+            self.log(f"{output_file} has already been downloaded")
+            self.status_var.set("Already downloaded")
+            return output_file
+        
+        self.log(f"Multi-connection download: {selected.get('format')}")
+        last_update = [0]
+        
+        def on_progress(downloaded, total):
+            now = time.time()
+            if now - last_update[0] >= 0.25 or downloaded == total:
+                last_update[0] = now
+                percent = downloaded * 100 / total
+                self.progress_var.set(percent)
+                self.status_var.set(f"Downloading (8 connections)... {percent:.1f}%")
+        
+        downloader = RangedDownloader(selected['url'], output_file,
+                                      headers=selected.get('http_headers'),
+                                      connections=8,
+                                      progress_callback=on_progress,
+                                      cancel_check=lambda: not self.is_downloading)
+        try:
+            start_time = time.time()
+            with self.profile_stage("ranged download"):
+                file_size = downloader.download()
         except Exception as e:
-            self.log(f"Standard download error: {e}")
-            self.status_var.set("Download failed!")
+            if not self.is_downloading:
+                return None
+            self.log(f"Multi-connection download failed ({e}) - using yt-dlp instead")
+            return None
+        
+        elapsed = max(time.time() - start_time, 0.001)
+        self.log(f"Download completed successfully! ({file_size/1024/1024/elapsed:.2f} MB/s)")
+        return output_file
+    
+    def new_output_record(self):
+        """Create an empty file for yt-dlp to write the final output path into"""
+        APP_DATA_DIR.mkdir(parents=True, exist_ok=True)
+        
+        # Records of failed runs are never read back - drop the stale ones
+        cutoff = time.time() - STREAM_CACHE_MAX_AGE
+        for stale_path in glob.glob(os.path.join(str(APP_DATA_DIR), "output-*.txt")):
             try:
-                messagebox.showerror("Error", f"Download failed: {e}")
-            except Exception as e2:
-                print(f"Error showing error message: {e2}")
+                if os.path.getmtime(stale_path) < cutoff:
+                    os.remove(stale_path)
+            except OSError:
+                pass
+        
+        fd, record_path = tempfile.mkstemp(prefix="output-", suffix=".txt", dir=str(APP_DATA_DIR))
+        os.close(fd)
+        return record_path
+    
+    def read_output_record(self, record_path):
+        """Return the output paths yt-dlp recorded (one per clip section)"""
+        try:
+            with open(record_path, encoding='utf-8') as f:
+                paths = [line.strip() for line in f if line.strip()]
+            os.remove(record_path)
+        except OSError:
+            return []
+        
+        return [path for path in dict.fromkeys(paths) if os.path.exists(path)]
+    
+    def verify_download(self, output_file, job):
+        """Check a finished file and store the result in the job record
+        
+        Corrupt or truncated outputs mark the job to be queued again. Returns
+        True if the file looks complete.
+        """
+        problems = []
+        file_size = os.path.getsize(output_file)
+        if file_size == 0:
+            problems.append("file is empty")
+        
+        fingerprint = self.compute_fingerprint(output_file, file_size)
+        probe = self.probe_container(output_file)
+        
+        if probe is None:
+            self.log("ffprobe not found - container check skipped")
+        elif probe['error']:
+            problems.append(f"container check failed: {probe['error']}")
+        else:
+            cached = self.info_cache.get(job['url'])
+            # A clip is only one section of the video, so its length isn't checked
+            expected = cached['info'].get('duration') if cached and not job['sections'] else None
+            if expected and probe['duration'] is not None:
+                if abs(probe['duration'] - expected) > max(2.0, expected * 0.02):
+                    problems.append(f"duration is {probe['duration']:.1f}s, expected {expected:.1f}s")
+        
+        job['outputs'].append({
+            'path': output_file,
+            'size': file_size,
+            'fingerprint': fingerprint,
+            'verified': not problems
+        })
+        
+        if not problems:
+            self.log(f"Verified OK (fingerprint {fingerprint[:16]})")
+            return True
+        
+        self.log(f"Verification failed: {'; '.join(problems)}")
+        job['verify_attempts'] = job.get('verify_attempts', 0) + 1
+        if job['verify_attempts'] <= MAX_VERIFY_RETRIES and not job.get('requeue'):
+            # Overwrite the corrupt file on the next attempt, once the job leaves the pipeline
+            job['force'] = True
+            job['requeue'] = True
+            self.log(f"Re-queued for attempt {job['verify_attempts'] + 1}")
+        return False
+    
+    def compute_fingerprint(self, path, file_size):
+        """Hash the file size and evenly spaced sample blocks of a file
+        
+        Reads at most FINGERPRINT_SAMPLES blocks, however large the file is.
+        """
+        digest = hashlib.sha256(str(file_size).encode('utf-8'))
+        with open(path, 'rb') as f:
+            if file_size <= FINGERPRINT_SAMPLES * FINGERPRINT_BLOCK_SIZE:
+                digest.update(f.read())
+            else:
+                step = (file_size - FINGERPRINT_BLOCK_SIZE) // (FINGERPRINT_SAMPLES - 1)
+                for index in range(FINGERPRINT_SAMPLES):
+                    f.seek(index * step)
+                    digest.update(f.read(FINGERPRINT_BLOCK_SIZE))
+        return digest.hexdigest()
+    
+    def probe_container(self, path):
+        """Read the container headers with ffprobe
+        
+        Returns None if ffprobe is not available.
+        """
+        cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration:stream=codec_type',
+               '-of', 'json', path]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        except FileNotFoundError:
+            return None
+        except subprocess.TimeoutExpired:
+            return {'duration': None, 'error': "ffprobe timed out"}
+        
+        if result.returncode != 0:
+            return {'duration': None, 'error': result.stderr.strip()[-300:] or "unreadable container"}
+        
+        try:
+            data = json.loads(result.stdout)
+            duration = data.get('format', {}).get('duration')
+            streams = [stream.get('codec_type') for stream in data.get('streams', [])]
+        except ValueError:
+            return {'duration': None, 'error': "unreadable ffprobe output"}
+        
+        if not streams:
+            return {'duration': None, 'error': "no streams found"}
+        return {'duration': float(duration) if duration else None, 'error': None}
     
     def find_downloaded_file(self, download_path):
         """Find the most recently downloaded file"""
@@ -914,23 +3290,71 @@ OR use chocolatey:
         """Open the videos folder in file explorer"""
         try:
             download_path = self.path_var.get().strip() or self.download_path
-            
-            if sys.platform == "win32":
-                os.startfile(download_path)
-            elif sys.platform == "darwin":  # macOS
-                subprocess.run(['open', download_path], check=True)
-            else:  # Linux
-                subprocess.run(['xdg-open', download_path], check=True)
-                
+            self.open_path(download_path)
             self.log(f"Opened videos folder: {download_path}")
             
         except Exception as e:
             self.show_error(f"Error opening videos folder: {e}")
     
+    def open_path(self, path):
+        """Open a file or folder with the system default application"""
+        if sys.platform == "win32":
+            os.startfile(path)
+        elif sys.platform == "darwin":  # macOS
+            subprocess.run(['open', path], check=True)
+        else:  # Linux
+            subprocess.run(['xdg-open', path], check=True)
+    
+    def get_library(self):
+        """Open the media library index on first use"""
+        if self.library is None:
+            self.library = MediaLibrary(APP_DATA_DIR / "library.sqlite3")
+        return self.library
+    
+    def open_library(self):
+        """Show the media library for the download folder"""
+        try:
+            download_path = self.path_var.get().strip() or self.download_path
+            LibraryView(self, self.get_library(), download_path)
+        except Exception as e:
+            self.show_error(f"Error opening library: {e}")
+    
+    def open_proxies(self):
+        """Show the proxy pool editor and per-endpoint stats"""
+        try:
+            ProxyView(self, self.proxy_pool)
+        except Exception as e:
+            self.show_error(f"Error opening proxy pool: {e}")
+    
+    def check_library_folder(self, job):
+        """Note whether the library is in sync with the job's folder before anything is written"""
+        try:
+            in_sync = self.get_library().folder_in_sync(job['download_path'])
+        except Exception as e:
+            print(f"Error checking library folder: {e}")
+            in_sync = False
+        job['synced_folder'] = job['download_path'] if in_sync else None
+    
+    def index_job(self, job):
+        """Add a finished job's verified outputs to the media library"""
+        try:
+            if job is None or job['paused']:
+                return
+            cached = self.info_cache.get(job['url'])
+            info = cached['info'] if cached else {}
+            for output in job['outputs']:
+                if output['verified'] and os.path.exists(output['path']):
+                    # The format column holds the container (file extension)
+                    self.get_library().add_item(output['path'], title=info.get('title'),
+                                                video_id=info.get('id', ''),
+                                                synced_folder=job.get('synced_folder'))
+        except Exception as e:
+            print(f"Error indexing download: {e}")
+    
     def safe_close(self):
         """Safely close the application"""
         try:
-            if self.is_downloading:
+            if self.is_downloading or self.pipeline.busy():
                 if messagebox.askokcancel("Quit", "Download in progress. Quit anyway?"):
                     self.is_downloading = False
                     if self.process and self.process.poll() is None:
@@ -959,11 +3383,30 @@ OR use chocolatey:
             import traceback
             traceback.print_exc()
 
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="YouTube Video Downloader")
+    parser.add_argument('--profile', action='store_true',
+                        help="record per-stage and per-function timings and write a report on exit")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="also run cProfile and list the top hot spots (implies --profile)")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="also track memory growth with tracemalloc (implies --profile)")
+    parser.add_argument('--profile-dir', default=str(APP_DATA_DIR / "profiles"),
+                        help="folder for profile reports (default: %(default)s)")
+    return parser.parse_args(argv)
+
 def main():
     """Main function with maximum error handling"""
+    args = parse_args()
+    profiler = None
+    if args.profile or args.cprofile or args.tracemalloc:
+        profiler = PerformanceProfiler(use_cprofile=args.cprofile, use_tracemalloc=args.tracemalloc)
+        print("Profiling enabled - a report will be written on exit")
+    
     try:
         print("Starting YouTube Downloader...")
-        app = FixedYouTubeDownloader()
+        app = FixedYouTubeDownloader(profiler=profiler)
         print("App created successfully, starting mainloop...")
         app.run()
         print("Application finished")
@@ -978,6 +3421,13 @@ def main():
         except Exception as e2:
             print(f"Error showing startup error: {e2}")
         sys.exit(1)
+    finally:
+        if profiler:
+            try:
+                report_path = profiler.write_report(args.profile_dir)
+                print(f"Profile report written to: {report_path}")
+            except Exception as e:
+                print(f"Error writing profile report: {e}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+GUI Responsiveness Benchmark
+Runs the downloader GUI against a stub yt-dlp and measures how the Tk loop copes
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from tkinter import messagebox
+
+import Youtube_Downloader_Windows as app_module
+
+# Stub yt-dlp: prints realistic output at a fixed rate instead of downloading
+STUB_SCRIPT = r'''
+import json, os, sys, time
+
+args = sys.argv[1:]
+settings = json.loads(os.environ["YTDLP_STUB_SETTINGS"])
+
+def arg_value(name):
+    return args[args.index(name) + 1] if name in args else None
+
+if "--version" in args:
+    print("stub-benchmark")
+    sys.exit(0)
+
+if "--dump-single-json" in args:
+    formats = []
+    for index in range(settings["formats"]):
+        height = [144, 240, 360, 480, 720, 1080][index % 6]
+        formats.append({
+            "format_id": str(100 + index), "ext": "mp4", "resolution": f"{height * 16 // 9}x{height}",
+            "height": height, "vcodec": "avc1", "acodec": "none" if index % 2 else "mp4a",
+            "filesize": settings["size"], "url": "https://example.invalid/stream"
+        })
+    print(json.dumps({"id": "benchmark", "title": "Benchmark Video", "duration": 60, "formats": formats}))
+    sys.exit(0)
+
+output_template = arg_value("-o") or "%(title)s.%(ext)s"
+output_file = output_template.replace("%(title)s", "Benchmark Video").replace("%(ext)s", "mp4")
+delay = 1.0 / settings["rate"]
+
+print("[youtube] Extracting URL: benchmark", flush=True)
+print("[info] benchmark: Downloading 1 format(s): 137+140", flush=True)
+print(f"[download] Destination: {output_file}", flush=True)
+for line in range(settings["lines"]):
+    percent = 100.0 * (line + 1) / settings["lines"]
+    print(f"[download]  {percent:5.1f}% of   10.00MiB at    5.00MiB/s ETA 00:01 (frag {line}/{settings['lines']})",
+          flush=True)
+    time.sleep(delay)
+print(f'[Merger] Merging formats into "{output_file}"', flush=True)
+
+with open(output_file, "wb") as f:
+    f.write(os.urandom(1024))
+if "--print-to-file" in args:
+    record = args[args.index("--print-to-file") + 2]
+    with open(record, "a", encoding="utf-8") as f:
+        f.write(output_file + "\n")
+'''
+
+# App methods whose CPU cost per call is reported
+MEASURED_METHODS = ['log', 'handle_output_line', 'update_format_list', 'get_formats_sync',
+                    'update_queue_list', 'schedule_jobs']
+
+
+def percentile(values, fraction):
+    """Return the value at a fraction (0-1) of the sorted values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Measure GUI responsiveness under synthetic download load")
+    parser.add_argument('--jobs', type=int, default=3, help="queued jobs to run (default: %(default)s)")
+    parser.add_argument('--rate', type=float, default=200,
+                        help="stub output lines per second (default: %(default)s)")
+    parser.add_argument('--lines', type=int, default=1000,
+                        help="progress lines per job (default: %(default)s)")
+    parser.add_argument('--formats', type=int, default=60,
+                        help="formats returned by each format-list refresh (default: %(default)s)")
+    parser.add_argument('--refresh-interval', type=float, default=5.0,
+                        help="seconds between format-list refreshes, 0 to disable (default: %(default)s)")
+    parser.add_argument('--tick-ms', type=int, default=10,
+                        help="event loop probe interval in ms (default: %(default)s)")
+    parser.add_argument('--output', help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def run_benchmark(args):
+    """Run the GUI under load and return the report text"""
+    work_dir = Path(tempfile.mkdtemp(prefix="gui-benchmark-"))
+    stub_path = work_dir / "yt_dlp_stub.py"
+    stub_path.write_text(STUB_SCRIPT, encoding='utf-8')
+    os.environ["YTDLP_STUB_SETTINGS"] = json.dumps({
+        'rate': args.rate, 'lines': args.lines, 'formats': args.formats, 'size': 10 * 1024 * 1024
+    })
+
+    # Keep the benchmark away from the real history, caches and dialogs
+    app_module.YT_DLP_COMMAND = [sys.executable, str(stub_path)]
+    app_module.APP_DATA_DIR = work_dir / "data"
+    for name in ('showinfo', 'showwarning', 'showerror'):
+        setattr(messagebox, name, lambda *a, **k: None)
+    messagebox.askokcancel = lambda *a, **k: True
+
+    profiler = app_module.PerformanceProfiler()
+    app = app_module.FixedYouTubeDownloader(profiler=profiler)
+    profiler.wrap_methods(app, [name for name in MEASURED_METHODS if name not in app_module.PROFILED_METHODS])
+    # The stub writes placeholder bytes, so only the size check applies
+    app.probe_container = lambda path: None
+
+    url = "https://www.youtube.com/watch?v=benchmark"
+    app.url_var.set(url)
+    app.path_var.set(str(work_dir))
+    app.force_download_var.set(True)
+    for _ in range(args.jobs):
+        app.push_job(app.build_job(url, str(work_dir), "Normal", False))
+
+    lags = []
+    state = {'expected': None, 'last_refresh': time.perf_counter(), 'started': False}
+
+    def probe():
+        now = time.perf_counter()
+        if state['expected'] is not None:
+            lags.append(max(now - state['expected'], 0.0) * 1000)
+        state['expected'] = now + args.tick_ms / 1000
+
+        busy = app.download_thread is not None and app.download_thread.is_alive()
+        state['started'] = state['started'] or busy
+        if (state['started'] and not busy and not app.job_queue and app.current_job is None
+                and not app.pipeline.busy()):
+            app.root.quit()
+            return
+
+        if args.refresh_interval and now - state['last_refresh'] >= args.refresh_interval:
+            state['last_refresh'] = now
+            app.get_formats_sync()
+        app.root.after(args.tick_ms, probe)
+
+    start = time.perf_counter()
+    app.root.after(args.tick_ms, probe)
+    app.root.mainloop()
+    elapsed = time.perf_counter() - start
+    app.root.destroy()
+
+    lines = [
+        f"GUI responsiveness benchmark - {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"Jobs: {args.jobs}, output rate: {args.rate:g} lines/s, lines per job: {args.lines}, "
+        f"formats per refresh: {args.formats}, refresh every {args.refresh_interval:g}s",
+        f"Run time: {elapsed:.2f}s",
+        "",
+        f"Event loop lag over {len(lags)} probes every {args.tick_ms} ms:",
+        f"  p50 {percentile(lags, 0.50):.2f} ms   p90 {percentile(lags, 0.90):.2f} ms   "
+        f"p99 {percentile(lags, 0.99):.2f} ms   max {max(lags, default=0):.2f} ms",
+        "",
+        "Per-update cost:",
+        f"  {'function':<24}{'calls':>8}{'cpu avg':>12}{'wall avg':>12}{'wall max':>12}"
+    ]
+    for (kind, name), (count, wall, cpu, wall_max) in sorted(profiler.timings.items()):
+        if kind == 'function' and name in MEASURED_METHODS:
+            lines.append(f"  {name:<24}{count:>8}{cpu / count * 1000:>10.3f}ms"
+                         f"{wall / count * 1000:>10.3f}ms{wall_max * 1000:>10.2f}ms")
+    return "\n".join(lines)
+
+
+def main():
+    """Run the benchmark and print the report"""
+    args = parse_args()
+    report = run_benchmark(args)
+    print(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+RangedDownloader tests against a local range server that redirects, drops
+connections and stalls
+Run with: python -m pytest tests  (or python -m unittest discover tests)
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import Youtube_Downloader_Windows as app_module
+
+PAYLOAD = os.urandom(3 * 1024 * 1024 + 12345)
+PAYLOAD_SHA1 = hashlib.sha1(PAYLOAD).hexdigest()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD at /file with 206 responses; /start redirects there
+    
+    Faults are set on the server: every drop_every-th range response closes
+    the connection halfway, and every stall_every-th one pauses mid-body for
+    longer than the client's stall timeout.
+    """
+    
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        server = self.server
+        if self.path == '/start':
+            self.send_response(302)
+            self.send_header('Location', '/file')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        match = re.match(r'bytes=(\d+)-(\d+)', self.headers.get('Range', ''))
+        if self.path != '/file' or not match:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        start, end = int(match.group(1)), min(int(match.group(2)), len(PAYLOAD) - 1)
+        with server.lock:
+            server.requests += 1
+            number = server.requests
+            server.bytes_requested += end - start + 1
+        
+        body = PAYLOAD[start:end + 1]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {start}-{end}/{len(PAYLOAD)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        
+        # The size probe is never faulted
+        faulty = number > 1 and len(body) > 1
+        if faulty and server.drop_every and number % server.drop_every == 0:
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        if faulty and server.stall_every and number % server.stall_every == 0:
+            self.wfile.write(body[:len(body) // 3])
+            self.wfile.flush()
+            time.sleep(server.stall_seconds)
+            try:
+                self.wfile.write(body[len(body) // 3:])
+            except OSError:
+                pass
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+class RangeServer(ThreadingHTTPServer):
+    daemon_threads = True
+    
+    def handle_error(self, request, client_address):
+        # Clients dropping stalled connections is expected here
+        pass
+
+
+class RangedDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = RangeServer(('127.0.0.1', 0), RangeHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.bytes_requested = 0
+        self.server.drop_every = 0
+        self.server.stall_every = 0
+        self.server.stall_seconds = 1.5
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.temp_dir = tempfile.mkdtemp()
+        self.output_path = os.path.join(self.temp_dir, "video.mp4")
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def downloader(self, **kwargs):
+        kwargs.setdefault('min_range_size', 128 * 1024)
+        kwargs.setdefault('stall_timeout', 0.5)
+        return app_module.RangedDownloader(f"{self.base_url}/start", self.output_path,
+                                           connections=4, **kwargs)
+    
+    def output_sha1(self):
+        with open(self.output_path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    
+    def test_download_through_redirect(self):
+        self.assertEqual(self.downloader().download(), len(PAYLOAD))
+        self.assertEqual(self.output_sha1(), PAYLOAD_SHA1)
+        self.assertEqual(os.listdir(self.temp_dir), ["video.mp4"])
+    
+    def test_dropped_and_stalled_connections(self):
+        self.server.drop_every = 4
+        self.server.stall_every = 7
+        progress = []
+        downloader = self.downloader(max_retries=20,
+                                     progress_callback=lambda done, total: progress.append(done))
+        
+        self.assertEqual(downloader.download(), len(PAYLOAD))
+        self.assertEqual(self.output_sha1(), PAYLOAD_SHA1)
+        self.assertEqual(progress[-1], len(PAYLOAD))
+        self.assertEqual(progress, sorted(progress))
+    
+    def test_rejects_server_without_ranges(self):
+        downloader = app_module.RangedDownloader(f"{self.base_url}/missing", self.output_path)
+        with self.assertRaises(RuntimeError):
+            downloader.download()
+        self.assertFalse(os.path.exists(self.output_path))
+    
+    def test_cancelled_download_resumes(self):
+        stop = threading.Event()
+        
+        def on_progress(done, total):
+            if done >= total // 2:
+                stop.set()
+        
+        with self.assertRaises(RuntimeError):
+            self.downloader(progress_callback=on_progress, cancel_check=stop.is_set).download()
+        self.assertFalse(os.path.exists(self.output_path))
+        self.assertTrue(os.path.exists(self.output_path + '.ranges.part'))
+        self.assertTrue(os.path.exists(self.output_path + '.ranges.part.json'))
+        
+        first_run_bytes = self.server.bytes_requested
+        resumed = self.downloader()
+        self.assertEqual(resumed.download(), len(PAYLOAD))
+        self.assertEqual(self.output_sha1(), PAYLOAD_SHA1)
+        self.assertEqual(os.listdir(self.temp_dir), ["video.mp4"])
+        
+        # Only the missing ranges are fetched again
+        resumed_bytes = self.server.bytes_requested - first_run_bytes
+        self.assertLess(resumed_bytes, len(PAYLOAD) * 0.75)
+    
+    def test_failed_download_leaves_nothing_to_resume(self):
+        self.server.drop_every = 2
+        with self.assertRaises(RuntimeError):
+            self.downloader(max_retries=0).download()
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()